@@ -0,0 +1,195 @@
+"""Benchmarks of labyrinth hot paths.
+
+Run from the repository root:
+
+    python -m benchmarks.bench --output results.json
+    python -m benchmarks.bench --baseline benchmarks/baseline.json
+
+Every case is timed (median of --repeat runs) and its peak memory is traced in
+a separate run, so tracing does not slow down timing. With --baseline the run
+fails when a case is slower or uses more memory than the baseline allows: over
+--tolerance relatively and over --min-seconds or --min-bytes absolutely, so the
+noise of sub-millisecond cases is not reported.
+"""
+import sys
+import json
+import time
+import statistics
+import argparse
+import tracemalloc
+from io import BytesIO
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional
+
+from PIL import Image
+
+from labirinth import Labyrinth
+from labirinth.settings import PNG
+
+
+SIZES = [15, 51, 151, 501, 1001, 2001]
+BLOCK_SIZES = [16, 32, 64]
+MAX_PIXELS = 64 * 1024 * 1024
+GIF_BLOCK_SIZE = 4
+GIF_MAX_SIZE = 151
+SEED = 0
+MIN_SECONDS = 0.005
+MIN_BYTES = 64 * 1024
+
+
+class Case(NamedTuple):
+    name: str
+    size: int
+    block_size: Optional[int]
+    setup: Callable[[], Callable[[], object]]
+
+    @property
+    def key(self) -> str:
+        key = f'{self.name}[{self.size}]'
+        if self.block_size is not None:
+            key = f'{key}[{self.block_size}]'
+        return key
+
+
+def generated(size: int) -> Labyrinth:
+    lab = Labyrinth(size, size)
+    lab.generate(seed=SEED)
+    return lab
+
+
+def copied(lab: Labyrinth) -> Labyrinth:
+    return Labyrinth(lab=lab[:])
+
+
+def generate_case(size: int) -> Callable[[], object]:
+    return lambda: generated(size)
+
+
+def solve_case(size: int) -> Callable[[], object]:
+    lab = generated(size)
+    return lambda: copied(lab).get_solved_way()
+
+
+def render_case(size: int, block_size: int) -> Callable[[], object]:
+    lab = generated(size)
+    return lambda: lab.generate_image(block_size).create_sheet()
+
+
+def recognize_case(size: int, block_size: int) -> Callable[[], object]:
+    data = generated(size).save_as_bytes_io(block_size, PNG).getvalue()
+    return lambda: Labyrinth.from_pil_image(Image.open(BytesIO(data)))
+
+
+def gif_case(size: int, path: Path) -> Callable[[], object]:
+    lab = generated(size)
+    return lambda: copied(lab).solve_with_gif(str(path), GIF_BLOCK_SIZE)
+
+
+def create_cases(sizes: List[int], block_sizes: List[int], max_pixels: int, temp_dir: Path) -> Iterator[Case]:
+    for size in sizes:
+        yield Case('generate', size, None, lambda size=size: generate_case(size))
+        yield Case('solve', size, None, lambda size=size: solve_case(size))
+
+        for block_size in block_sizes:
+            if (size * block_size) ** 2 > max_pixels:
+                continue
+            yield Case('render', size, block_size, lambda size=size, bs=block_size: render_case(size, bs))
+            yield Case('recognize', size, block_size, lambda size=size, bs=block_size: recognize_case(size, bs))
+
+        if size <= GIF_MAX_SIZE:
+            yield Case('gif', size, GIF_BLOCK_SIZE, lambda size=size: gif_case(size, temp_dir / 'solve.gif'))
+
+
+def measure(case: Case, repeat: int) -> Dict[str, object]:
+    run = case.setup()
+
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        seconds.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'name': case.name,
+        'size': case.size,
+        'block_size': case.block_size,
+        'seconds': statistics.median(seconds),
+        'peak_bytes': peak,
+    }
+
+
+def compare(results: List[dict], baseline: List[dict], tolerance: float, min_seconds: float = MIN_SECONDS,
+            min_bytes: int = MIN_BYTES) -> List[str]:
+    """Regressions of results against baseline records of the same cases.
+
+    A metric regresses when it exceeds the baseline by more than tolerance and by more than
+    its absolute floor at once.
+    """
+    floors = {'seconds': min_seconds, 'peak_bytes': min_bytes}
+    expected = {(r['name'], r['size'], r['block_size']): r for r in baseline}
+    regressions = []
+    for result in results:
+        base = expected.get((result['name'], result['size'], result['block_size']))
+        if base is None:
+            continue
+
+        for metric in ('seconds', 'peak_bytes'):
+            limit = max(base[metric] * (1 + tolerance), base[metric] + floors[metric])
+            if result[metric] > limit:
+                regressions.append(
+                    f"{result['name']}[{result['size']}][{result['block_size']}] {metric}: "
+                    f'{result[metric]:.4g} > {limit:.4g}'
+                )
+    return regressions
+
+
+def parse_args(args: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Benchmark labyrinth generate, solve, render, recognize and GIF.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES)
+    parser.add_argument('--block-sizes', type=int, nargs='+', default=BLOCK_SIZES)
+    parser.add_argument('--max-pixels', type=int, default=MAX_PIXELS, help='skip images bigger than this')
+    parser.add_argument('--only', nargs='+', help='run only these cases (generate, solve, render, recognize, gif)')
+    parser.add_argument('--repeat', type=int, default=5, help='timed runs per case, the median is kept')
+    parser.add_argument('--output', help='write results as JSON')
+    parser.add_argument('--baseline', help='fail if results exceed this JSON baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed relative excess over baseline')
+    parser.add_argument('--min-seconds', type=float, default=MIN_SECONDS,
+                        help='time differences below this are noise, not regressions')
+    parser.add_argument('--min-bytes', type=int, default=MIN_BYTES,
+                        help='memory differences below this are noise, not regressions')
+    return parser.parse_args(args)
+
+
+def main(args: List[str] = None) -> int:
+    args = parse_args(sys.argv[1:] if args is None else args)
+
+    results = []
+    with TemporaryDirectory() as temp_dir:
+        for case in create_cases(args.sizes, args.block_sizes, args.max_pixels, Path(temp_dir)):
+            if args.only and case.name not in args.only:
+                continue
+            result = measure(case, args.repeat)
+            results.append(result)
+            print(f"{case.key:<24} {result['seconds']:>10.4f} s {result['peak_bytes'] / 2 ** 20:>10.1f} MiB")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        regressions = compare(results, baseline, args.tolerance, args.min_seconds, args.min_bytes)
+        for regression in regressions:
+            print(f'REGRESSION {regression}')
+        return 1 if regressions else 0
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,70 @@
+"""Correctness checks guarding behaviour that optimizations tend to break.
+
+Run from the repository root:
+
+    python -m benchmarks.checks
+
+Every check raises AssertionError on failure, the run fails if any check does.
+"""
+import io
+import sys
+import traceback
+from typing import Callable, List
+
+from PIL import Image, ImageSequence
+
+from labirinth import Labyrinth
+from labirinth.gif import GIFWriter
+
+
+SEED = 0
+
+
+def check_solve_twice():
+    """Solving does not consume enters, the same labyrinth gives the same way again."""
+    lab = Labyrinth(31, 41)
+    lab.generate(seed=SEED)
+    first = lab.get_solved_way()
+    second = lab.get_solved_way()
+    assert first == second, 'second solve found another way'
+    assert first[0] != first[-1], 'way starts where it ends'
+
+
+def check_gif_colors():
+    """Frames with colours missing from the first frame keep their own colours."""
+    colors = [(255, 255, 255), (255, 0, 0), (0, 0, 255), (255, 0, 0)]
+    file = io.BytesIO()
+    writer = GIFWriter(file)
+    for color in colors:
+        writer.append(Image.new('RGB', (10, 10), color))
+    writer.close()
+
+    file.seek(0)
+    frames = [frame.convert('RGB') for frame in ImageSequence.Iterator(Image.open(file))]
+    assert len(frames) == len(colors), f'{len(frames)} frames decoded instead of {len(colors)}'
+    for frame, color in zip(frames, colors):
+        assert frame.getpixel((5, 5)) == color, f'{frame.getpixel((5, 5))} decoded instead of {color}'
+
+
+CHECKS: List[Callable[[], None]] = [
+    check_solve_twice,
+    check_gif_colors,
+]
+
+
+def main() -> int:
+    failed = 0
+    for check in CHECKS:
+        try:
+            check()
+        except Exception:
+            failed += 1
+            print(f'FAIL {check.__name__}')
+            traceback.print_exc()
+        else:
+            print(f'ok   {check.__name__}')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
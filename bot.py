@@ -1,9 +1,11 @@
 import logging
+from concurrent.futures import ProcessPoolExecutor
 
 from telegram.ext import Updater, Dispatcher
 
-from bot_settings import TOKEN
-from labbot import start_command, conversation
+from bot_settings import TOKEN, WORKERS, CACHE_SIZE, CACHE_TTL, POOL_SIZES, POOL_DEPTH
+from labbot import start_command, conversation, EXECUTOR, CACHE, POOL, ResultCache, WarmPool
+from labirinth.settings import SUPPORT_EXTENSIONS, BACKTRACKER
 
 
 logging.basicConfig(
@@ -17,11 +19,19 @@ def run_bot():
     db: Dispatcher = updater.dispatcher
     db.add_handler(start_command)
     db.add_handler(conversation)
+    db.bot_data[CACHE] = ResultCache(CACHE_SIZE, CACHE_TTL)
 
     logging.info("Bot's starting ...")
 
-    updater.start_polling()
-    updater.idle()
+    with ProcessPoolExecutor(max_workers=WORKERS) as executor:
+        db.bot_data[EXECUTOR] = executor
+
+        pool_keys = [(size, extension, BACKTRACKER) for size in POOL_SIZES for extension in SUPPORT_EXTENSIONS]
+        db.bot_data[POOL] = pool = WarmPool(executor, pool_keys, POOL_DEPTH)
+        pool.start()
+
+        updater.start_polling()
+        updater.idle()
 
     logging.info('Bot closed.')
 
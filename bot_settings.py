@@ -1,3 +1,8 @@
 import os
 
 TOKEN = os.environ.get('BOT_TOKEN') or 'TOKEN'
+WORKERS = int(os.environ.get('BOT_WORKERS') or 0) or None
+CACHE_SIZE = int(os.environ.get('BOT_CACHE_SIZE') or 1024)
+CACHE_TTL = int(os.environ.get('BOT_CACHE_TTL') or 24 * 60 * 60)
+POOL_SIZES = [int(size) for size in (os.environ.get('BOT_POOL_SIZES') or '15,31,51,101').split(',')]
+POOL_DEPTH = int(os.environ.get('BOT_POOL_DEPTH') or 2)
@@ -1,4 +1,9 @@
 from .lab_bot import (
     start_command,
     conversation,
+    EXECUTOR,
+    CACHE,
+    POOL,
 )
+from .pool import WarmPool
+from .cache import ResultCache
@@ -0,0 +1,53 @@
+import time
+from threading import Lock
+from collections import OrderedDict
+from typing import Hashable, Optional, Callable
+
+
+class ResultCache:
+    """In-memory LRU cache with size bound and TTL eviction.
+
+    Stores Telegram file_id of already sent results, so repeated requests are
+    answered without rendering and uploading them again.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 24 * 60 * 60, clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self._items: 'OrderedDict[Hashable, tuple]' = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key: Hashable) -> Optional[str]:
+        """Get value by key, expired value is evicted.
+
+        :param key: key
+        :return: value or None
+        """
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+
+            value, expires = item
+            if expires <= self.clock():
+                del self._items[key]
+                return None
+
+            self._items.move_to_end(key)
+            return value
+
+    def put(self, key: Hashable, value: str):
+        """Insert value, the least recently used value is evicted when cache is full.
+
+        :param key: key
+        :param value: value
+        """
+        with self._lock:
+            self._items[key] = (value, self.clock() + self.ttl)
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def __len__(self):
+        return len(self._items)
@@ -2,6 +2,9 @@ from .conv_helpers import (
     end_conv,
     continue_conv,
     delete_messages,
+    delete_chat_messages,
     add_messages_to_delete,
     get_messages_to_delete,
+    pop_messages_to_delete,
+    delete_message_list,
 )
@@ -42,16 +42,40 @@ def delete_messages(func: ConvHandler) -> ConvHandler:
     @wraps(func)
     def wrapper(update: Update, context: CallbackContext):
         result = func(update, context)
-        to_delete_message = get_messages_to_delete(context)
-        for message in to_delete_message:
-            try:
-                message.delete()
-            except TelegramError as err:
-                logging.debug(err)
+        delete_chat_messages(context)
         return result
     return wrapper
 
 
+def pop_messages_to_delete(context: CallbackContext) -> List[Message]:
+    """Take from chat context messages that need to be delete, the context forgets them.
+
+    :param context: CallBackContext
+    :return: Messages
+    """
+    return context.chat_data.pop(_MESSAGES_TO_DELETE, [])
+
+
+def delete_message_list(messages: List[Message]):
+    """Delete messages, already deleted ones are skipped.
+
+    :param messages: messages
+    """
+    for message in messages:
+        try:
+            message.delete()
+        except TelegramError as err:
+            logging.debug(err)
+
+
+def delete_chat_messages(context: CallbackContext):
+    """Delete messages that was added through func 'add_messages_to_delete'.
+
+    :param context: CallBackContext
+    """
+    delete_message_list(pop_messages_to_delete(context))
+
+
 def end_conv(func: ConvHandler) -> ConvHandler:
     """This func closes conversion.
 
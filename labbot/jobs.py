@@ -0,0 +1,49 @@
+"""CPU-bound bot work, run in worker processes.
+
+Jobs take compact payloads and return encoded images, so only small
+arguments and bytes cross the process boundary.
+"""
+import logging
+from io import BytesIO
+from typing import Optional
+
+from PIL import Image
+
+from labirinth import Labyrinth, LabyrinthError, StatsProgress
+from labirinth.settings import PNG
+
+logger = logging.getLogger(__name__)
+
+
+def log_stage(stage: str, seconds: float, count: int):
+    logger.info('Stage %s took %.3f s for %d cells', stage, seconds, count)
+
+
+def generate_job(size: int, block_size: int, algorithm: str, seed: int = None) -> bytes:
+    """Generate labyrinth and render it to PNG.
+
+    :param size: height and width of labyrinth
+    :param block_size: size of one cell in pixels
+    :param algorithm: generation algorithm
+    :param seed: generation seed
+    :return: PNG bytes
+    """
+    lab = Labyrinth(size, size, progress=StatsProgress(log_stage))
+    lab.generate(algorithm=algorithm, seed=seed)
+    return lab.save_as_bytes_io(block_size, PNG).getvalue()
+
+
+def solve_job(data: bytes, block_size: int) -> Optional[bytes]:
+    """Recognize labyrinth from uploaded image, solve it and render it to PNG.
+
+    :param data: uploaded image
+    :param block_size: size of one cell in pixels
+    :return: PNG bytes or None if labyrinth can not be recognized
+    """
+    try:
+        lab = Labyrinth.from_pil_image(Image.open(BytesIO(data)), StatsProgress(log_stage))
+        lab.solve()
+    except (LabyrinthError, IndexError, OSError):
+        return None
+
+    return lab.save_as_bytes_io(block_size, PNG).getvalue()
@@ -1,6 +1,8 @@
 import logging
-from tempfile import NamedTemporaryFile
-
+import hashlib
+from io import BytesIO
+from typing import Callable, Hashable, List, Optional
+from concurrent.futures import Executor, Future
 
 from telegram.update import Update
 from telegram.message import Message
@@ -10,18 +12,25 @@ from telegram import (InlineKeyboardButton, InlineKeyboardMarkup, CallbackQuery,
                       KeyboardButton)
 
 from .utils import is_even
-from labirinth import Labyrinth, LabyrinthError
-from . import patterns
-from .conv_helper import add_messages_to_delete, end_conv, delete_messages, continue_conv
-from labirinth.settings import LOW_EXTENSION, MEDIUM_EXTENSION, HEIGHT_EXTENSION
+from . import patterns, jobs
+from .pool import WarmPool
+from .cache import ResultCache
+from .conv_helper import (add_messages_to_delete, end_conv, delete_chat_messages, continue_conv, pop_messages_to_delete,
+                          delete_message_list)
+from labirinth.settings import LOW_EXTENSION, MEDIUM_EXTENSION, HEIGHT_EXTENSION, ALGORITHMS, BACKTRACKER
 
 
 logger = logging.getLogger(__name__)
 
 BLOCK_SIZE = 64
 LIMIT = 150
+IMAGE_NAME = 'labyrinth.png'
+
+EXECUTOR = 'executor'
+CACHE = 'cache'
+POOL = 'pool'
 
-START_CONV, CHOSE_MODE, GENERATE_LAB, SOLVE_LAB, CHOSE_EXTENSION = range(5)
+START_CONV, CHOSE_MODE, GENERATE_LAB, SOLVE_LAB, CHOSE_EXTENSION, CHOSE_ALGORITHM = range(6)
 
 GENERATE, SOLVE = range(2)
 
@@ -73,7 +82,7 @@ def chose_mode(update: Update, context: CallbackContext):
     raise ValueError('Wrong mode.')
 
 
-@continue_conv(GENERATE_LAB)
+@continue_conv(CHOSE_ALGORITHM)
 def chose_extension(update: Update, context: CallbackContext):
     query: CallbackQuery = update.callback_query
     query.answer()
@@ -81,55 +90,133 @@ def chose_extension(update: Update, context: CallbackContext):
     chat_data: dict = context.chat_data
     chat_data['extension'] = extension
 
+    keyboard = [
+        [InlineKeyboardButton(algorithm.capitalize(), callback_data=algorithm)]
+        for algorithm in ALGORITHMS
+    ]
+    reply_markup = InlineKeyboardMarkup(keyboard)
+    query.edit_message_text('Chose algorithm:', reply_markup=reply_markup)
+
+
+@continue_conv(GENERATE_LAB)
+def chose_algorithm(update: Update, context: CallbackContext):
+    query: CallbackQuery = update.callback_query
+    query.answer()
+    chat_data: dict = context.chat_data
+    chat_data['algorithm'] = query.data
+
     message: Message = query.message
-    add_messages_to_delete(context, message.reply_text('Enter lab size (e.g 64):'))
+    add_messages_to_delete(context, message.reply_text('Enter lab size and optional seed (e.g 64 or 64 42):'))
 
 
 @end_conv
-@delete_messages
 def generate_lab(update: Update, context: CallbackContext):
     message: Message = update.message
 
-    lab_size = int(message.text)
+    size, seed = patterns.SIZE_SEED.match(message.text).groups()
+    lab_size = int(size)
+    seed = None if seed is None else int(seed)
 
     if is_even(lab_size):
         lab_size += 1
 
     if lab_size > LIMIT:
         message.reply_text(f'Size is too long(max: {LIMIT}).😞')
+        delete_chat_messages(context)
         return None
 
-    add_messages_to_delete(context, message.reply_text("I got size. I'm generating labyrinth ⚙️⚙️⚙️"))
     add_messages_to_delete(context, message)
-    lab = Labyrinth(lab_size, lab_size)
-    lab.generate()
     extension = context.chat_data.get('extension', LOW_EXTENSION)
-    with NamedTemporaryFile(suffix='.jpg') as lab_image:
-        lab.save_as_image(path=lab_image.name, block_size=extension)
-        message.reply_document(lab_image)
+    algorithm = context.chat_data.get('algorithm', BACKTRACKER)
+
+    if seed is None:
+        image = get_pool(context).take((lab_size, extension, algorithm))
+        if image is not None:
+            send_image(context, message, image, None)
+            delete_chat_messages(context)
+            return None
+
+    key = None if seed is None else (GENERATE, lab_size, extension, algorithm, seed)
+    if reply_from_cache(context, message, key):
+        return None
+
+    add_messages_to_delete(context, message.reply_text("I got size. I'm generating labyrinth ⚙️⚙️⚙️"))
+    future = get_executor(context).submit(jobs.generate_job, lab_size, extension, algorithm, seed)
+    messages = pop_messages_to_delete(context)
+    future.add_done_callback(reply_with_image(context, message, messages, "I couldn't generate 😭.", key))
 
 
 @end_conv
-@delete_messages
 def solve_lab(update: Update, context: CallbackContext):
     message: Message = update.message
 
+    lab_file: File = message.document.get_file()
+    data = bytes(lab_file.download_as_bytearray())
+
+    key = (SOLVE, hashlib.sha256(data).hexdigest())
+    if reply_from_cache(context, message, key):
+        return None
+
     add_messages_to_delete(context, message.reply_text("I got labyrinth. I'm solving its."))
+    future = get_executor(context).submit(jobs.solve_job, data, BLOCK_SIZE)
+    messages = pop_messages_to_delete(context)
+    future.add_done_callback(reply_with_image(context, message, messages, "I couldn't solve 😭.", key))
+
+
+def get_executor(context: CallbackContext) -> Executor:
+    return context.bot_data[EXECUTOR]
+
+
+def get_cache(context: CallbackContext) -> ResultCache:
+    return context.bot_data[CACHE]
 
-    lab_file: File = message.document.get_file()
-    with NamedTemporaryFile(suffix='.jpg') as lab_image:
-        lab_file.download(lab_image.name)
-        try:
-            lab = Labyrinth.from_image(lab_image.name)
-        except (LabyrinthError, IndexError):
-            message.reply_text("I couldn't solve 😭.")
-            return None
 
-    lab.solve()
+def get_pool(context: CallbackContext) -> WarmPool:
+    return context.bot_data[POOL]
+
+
+def send_image(context: CallbackContext, message: Message, image: bytes, key: Optional[Hashable]):
+    """Reply with image and cache file id of the sent document by key, random results (key is None) are not cached."""
+    sent: Message = message.reply_document(BytesIO(image), filename=IMAGE_NAME)
+    if key is not None:
+        get_cache(context).put(key, sent.document.file_id)
+
+
+def reply_from_cache(context: CallbackContext, message: Message, key: Optional[Hashable]) -> bool:
+    """Reply with already uploaded result if it is cached."""
+    if key is None:
+        return False
+
+    file_id = get_cache(context).get(key)
+    if file_id is None:
+        return False
+
+    message.reply_document(file_id)
+    delete_chat_messages(context)
+    return True
+
+
+def reply_with_image(context: CallbackContext, message: Message, messages: List[Message], error_text: str,
+                     key: Optional[Hashable]) -> Callable[[Future], None]:
+    """Callback for finished job that sends its image (or error text) and deletes messages of its conversation.
+
+    Messages are taken from chat data at submit time, the callback runs in another thread
+    and must not touch chat data of a conversation started meanwhile.
+    File id of the sent image is cached by key.
+    """
+    def callback(future: Future):
+        try:
+            image = future.result()
+        except Exception as err:
+            logger.exception(err)
+            image = None
 
-    with NamedTemporaryFile(suffix='.jpg') as solved_lab:
-        lab.save_as_image(solved_lab.name)
-        message.reply_document(solved_lab)
+        if image is None:
+            message.reply_text(error_text)
+        else:
+            send_image(context, message, image, key)
+        delete_message_list(messages)
+    return callback
 
 
 start_command = CommandHandler('start', start)
@@ -138,9 +225,10 @@ conversation = ConversationHandler(
     entry_points=[MessageHandler(Filters.regex(patterns.START_CONV), start_conv)],
     states={
         CHOSE_MODE: [CallbackQueryHandler(chose_mode)],
-        GENERATE_LAB: [MessageHandler(Filters.regex(patterns.NUMBER), generate_lab)],
+        GENERATE_LAB: [MessageHandler(Filters.regex(patterns.SIZE_SEED), generate_lab)],
         SOLVE_LAB: [MessageHandler(Filters.document, solve_lab)],
         CHOSE_EXTENSION: [CallbackQueryHandler(chose_extension, pattern=patterns.EXTENSION)],
+        CHOSE_ALGORITHM: [CallbackQueryHandler(chose_algorithm, pattern=patterns.ALGORITHM)],
     },
     fallbacks=[start_command],
 )
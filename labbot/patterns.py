@@ -1,10 +1,11 @@
 import re
 
-from labirinth.settings import LOW_EXTENSION, MEDIUM_EXTENSION, HEIGHT_EXTENSION
+from labirinth.settings import LOW_EXTENSION, MEDIUM_EXTENSION, HEIGHT_EXTENSION, ALGORITHMS
 
 
 START_CONV_TEXT = 'GO'
 
-NUMBER = re.compile('^[0-9]+$')
+SIZE_SEED = re.compile('^([0-9]+)(?: ([0-9]{1,18}))?$')
 START_CONV = re.compile(f'^{START_CONV_TEXT}$')
 EXTENSION = re.compile(f'^{LOW_EXTENSION}|{MEDIUM_EXTENSION}|{HEIGHT_EXTENSION}$')
+ALGORITHM = re.compile(f'^({"|".join(ALGORITHMS)})$')
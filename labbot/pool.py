@@ -0,0 +1,74 @@
+import random
+import logging
+from threading import Lock
+from functools import partial
+from collections import deque
+from concurrent.futures import Executor, Future
+from typing import Iterable, Optional, Tuple, Dict, Deque
+
+from . import jobs
+
+
+logger = logging.getLogger(__name__)
+
+PoolKey = Tuple[int, int, str]
+
+
+class WarmPool:
+    """Pre-generated rendered labyrinths for popular (size, block size, algorithm) requests.
+
+    Every taken labyrinth is replaced by a new one generated in background by executor.
+    """
+
+    def __init__(self, executor: Executor, keys: Iterable[PoolKey], depth: int = 2):
+        self.executor = executor
+        self.depth = depth
+        self._ready: Dict[PoolKey, Deque[bytes]] = {key: deque() for key in keys}
+        self._pending: Dict[PoolKey, int] = {key: 0 for key in self._ready}
+        self._lock = Lock()
+
+    def start(self):
+        """Fill pool up to depth for every key."""
+        for key in self._ready:
+            self._refill(key)
+
+    def take(self, key: PoolKey) -> Optional[bytes]:
+        """Take ready image and schedule generation of replacement.
+
+        :param key: (size, block size, algorithm)
+        :return: PNG bytes or None if there is no ready image for key
+        """
+        if key not in self._ready:
+            return None
+
+        with self._lock:
+            images = self._ready[key]
+            image = images.popleft() if images else None
+
+        self._refill(key)
+        return image
+
+    def _refill(self, key: PoolKey):
+        with self._lock:
+            missing = self.depth - len(self._ready[key]) - self._pending[key]
+            self._pending[key] += max(missing, 0)
+
+        for _ in range(missing):
+            size, block_size, algorithm = key
+            future = self.executor.submit(jobs.generate_job, size, block_size, algorithm, random.getrandbits(64))
+            future.add_done_callback(partial(self._done, key))
+
+    def _done(self, key: PoolKey, future: Future):
+        try:
+            image = future.result()
+        except Exception as err:
+            logger.exception(err)
+            image = None
+
+        with self._lock:
+            self._pending[key] -= 1
+            if image is not None:
+                self._ready[key].append(image)
+
+    def __len__(self):
+        return sum(map(len, self._ready.values()))
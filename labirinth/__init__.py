@@ -1,3 +1,5 @@
 from .labyrinth import Labyrinth, LabyrinthError
-from .gif import DynamicGIF
+from .gif import DynamicGIF, GIFError
 from .matrix import Matrix
+from .tree_index import TreeIndex
+from .progress import Progress, TqdmProgress, StatsProgress
@@ -0,0 +1,332 @@
+from random import Random
+from typing import Iterator
+
+import numpy as np
+
+from .utils import Coord, is_odd
+from .settings import EMPTY, WALL, ENTER, BACKTRACKER, KRUSKAL, PRIM, WILSON, BINARY_TREE, SIDEWINDER
+
+BORDER = 1
+IN_MAZE = 2
+FRONTIER = 3
+
+
+class CellGrid:
+    """Cells of a labyrinth grid (odd coordinates) addressed by flat indices.
+
+    Cells are numbered row by row in a cell space padded with a ring of
+    border cells, so neighbours are plain offsets and need no bounds checks.
+    """
+
+    def __init__(self, grid: np.ndarray):
+        height, width = grid.shape
+        self.grid = grid.reshape(-1)
+        self.grid_width = width
+        self.width = (width - 1) // 2
+        self.height = (height - 1) // 2
+        self.stride = self.width + 2
+        self.size = self.stride * (self.height + 2)
+        self.offsets = (-self.stride, self.stride, -1, 1)
+
+    def blank(self) -> bytearray:
+        """Cell states with the border ring already marked as BORDER (visited)."""
+        visited = np.full((self.height + 2, self.stride), BORDER, dtype=np.uint8)
+        visited[1:-1, 1:-1] = 0
+        return bytearray(visited.tobytes())
+
+    def cells(self) -> Iterator[int]:
+        for y in range(1, self.height + 1):
+            start = y * self.stride + 1
+            yield from range(start, start + self.width)
+
+    def index(self, coord: Coord) -> int:
+        x, y = coord
+        if not (is_odd(x) and is_odd(y) and 0 < x < 2 * self.width + 1 and 0 < y < 2 * self.height + 1):
+            raise ValueError(f'{coord} is not a cell.')
+        return (y + 1) // 2 * self.stride + (x + 1) // 2
+
+    def to_grid(self, cell: int) -> int:
+        y, x = divmod(cell, self.stride)
+        return (2 * y - 1) * self.grid_width + 2 * x - 1
+
+    def carve(self, cell: int, neighbour: int):
+        self.grid[(self.to_grid(cell) + self.to_grid(neighbour)) // 2] = EMPTY
+
+    def __len__(self):
+        return self.width * self.height
+
+
+def backtracker(cells: CellGrid, rng: Random, start: int, status=None):
+    """Randomized depth-first search with an explicit backtracking stack."""
+    visited = cells.blank()
+    offsets = cells.offsets
+    not_visited = len(cells) - 1
+    restart = cells.cells()
+
+    visited[start] = 1
+    stack = [start]
+    while not_visited:
+        if not stack:
+            start = next(cell for cell in restart if not visited[cell])
+            visited[start] = 1
+            not_visited -= 1
+            stack.append(start)
+            continue
+
+        current = stack[-1]
+        neighbours = [current + offset for offset in offsets if not visited[current + offset]]
+        if not neighbours:
+            stack.pop()
+            continue
+
+        neighbour = rng.choice(neighbours)
+        cells.carve(current, neighbour)
+        visited[neighbour] = 1
+        not_visited -= 1
+        stack.append(neighbour)
+        if status is not None:
+            status.update()
+
+
+def kruskal(cells: CellGrid, rng: Random, start: int, status=None):
+    """Randomized Kruskal over shuffled walls with an array-based union-find."""
+    stride = cells.stride
+    edges = []
+    for cell in cells.cells():
+        y, x = divmod(cell, stride)
+        if x < cells.width:
+            edges.append(2 * cell)
+        if y < cells.height:
+            edges.append(2 * cell + 1)
+    rng.shuffle(edges)
+
+    parent = list(range(cells.size))
+    size = [1] * cells.size
+    not_joined = len(cells) - 1
+    for edge in edges:
+        if not not_joined:
+            break
+
+        cell, down = divmod(edge, 2)
+        neighbour = cell + (stride if down else 1)
+
+        root = cell
+        while parent[root] != root:
+            parent[root] = root = parent[parent[root]]
+        neighbour_root = neighbour
+        while parent[neighbour_root] != neighbour_root:
+            parent[neighbour_root] = neighbour_root = parent[parent[neighbour_root]]
+
+        if root == neighbour_root:
+            continue
+
+        if size[root] < size[neighbour_root]:
+            root, neighbour_root = neighbour_root, root
+        parent[neighbour_root] = root
+        size[root] += size[neighbour_root]
+
+        cells.carve(cell, neighbour)
+        not_joined -= 1
+        if status is not None:
+            status.update()
+
+
+def prim(cells: CellGrid, rng: Random, start: int, status=None):
+    """Randomized Prim growing the maze from a frontier of adjacent cells."""
+    state = cells.blank()
+    offsets = cells.offsets
+
+    state[start] = IN_MAZE
+    frontier = []
+    for offset in offsets:
+        if not state[start + offset]:
+            state[start + offset] = FRONTIER
+            frontier.append(start + offset)
+
+    while frontier:
+        i = rng.randrange(len(frontier))
+        current = frontier[i]
+        frontier[i] = frontier[-1]
+        frontier.pop()
+
+        in_maze = []
+        for offset in offsets:
+            neighbour = current + offset
+            neighbour_state = state[neighbour]
+            if neighbour_state == IN_MAZE:
+                in_maze.append(neighbour)
+            elif not neighbour_state:
+                state[neighbour] = FRONTIER
+                frontier.append(neighbour)
+
+        cells.carve(current, rng.choice(in_maze))
+        state[current] = IN_MAZE
+        if status is not None:
+            status.update()
+
+
+def wilson(cells: CellGrid, rng: Random, start: int, status=None):
+    """Wilson's algorithm: loop-erased random walks, uniform over all perfect mazes."""
+    state = cells.blank()
+    offsets = cells.offsets
+    walk = [0] * cells.size
+
+    state[start] = IN_MAZE
+    for origin in cells.cells():
+        if state[origin]:
+            continue
+
+        current = origin
+        while state[current] != IN_MAZE:
+            neighbours = [current + offset for offset in offsets if state[current + offset] != BORDER]
+            walk[current] = next_cell = rng.choice(neighbours)
+            current = next_cell
+
+        current = origin
+        while state[current] != IN_MAZE:
+            state[current] = IN_MAZE
+            cells.carve(current, walk[current])
+            current = walk[current]
+            if status is not None:
+                status.update()
+
+
+def carve_binary_tree(grids: np.ndarray, generator: np.random.Generator):
+    """Binary tree mazes carved into (..., H, W) grids of walls around empty cells with array operations.
+
+    Every cell opens to the north or to the east, the first row can open only to the east
+    and the last column only to the north.
+    """
+    height, width = (grids.shape[-2] - 1) // 2, (grids.shape[-1] - 1) // 2
+    north = generator.random((*grids.shape[:-2], height, width)) < 0.5
+    north[..., :, -1] = True
+    north[..., 0, :] = False
+
+    grids[..., 2:2 * height:2, 1:2 * width:2][north[..., 1:, :]] = EMPTY
+    grids[..., 1:2 * height:2, 2:2 * width:2][~north[..., :, :-1]] = EMPTY
+
+
+def carve_sidewinder(grids: np.ndarray, generator: np.random.Generator):
+    """Sidewinder mazes carved into (..., H, W) grids of walls around empty cells with array operations.
+
+    The first row is one corridor. Other rows are split into random runs of cells opened to the east,
+    every run opens to the north from one random cell of it.
+    """
+    height, width = (grids.shape[-2] - 1) // 2, (grids.shape[-1] - 1) // 2
+    shape = (*grids.shape[:-2], height, width)
+    east = generator.random(shape) < 0.5
+    east[..., 0, :] = True
+    east[..., :, -1] = False
+
+    columns = np.arange(width)
+    starts = np.ones(shape, dtype=bool)
+    starts[..., 1:] = ~east[..., :-1]
+    run_starts = np.maximum.accumulate(np.where(starts, columns, 0), axis=-1)
+
+    *index, row, column = np.nonzero(~east[..., 1:, :])
+    lengths = column - run_starts[(*index, row + 1, column)] + 1
+    chosen = column - (generator.random(lengths.shape) * lengths).astype(np.intp)
+    north = np.zeros(shape, dtype=bool)
+    north[(*index, row + 1, chosen)] = True
+
+    grids[..., 2:2 * height:2, 1:2 * width:2][north[..., 1:, :]] = EMPTY
+    grids[..., 1:2 * height:2, 2:2 * width:2][east[..., :, :-1]] = EMPTY
+
+
+def binary_tree(cells: CellGrid, rng: Random, start: int, status=None):
+    """Vectorized binary tree, the start cell does not matter."""
+    carve_binary_tree(cells.grid.reshape(-1, cells.grid_width), np.random.default_rng(rng.getrandbits(64)))
+    if status is not None:
+        status.update(len(cells) - 1)
+
+
+def sidewinder(cells: CellGrid, rng: Random, start: int, status=None):
+    """Vectorized sidewinder, the start cell does not matter."""
+    carve_sidewinder(cells.grid.reshape(-1, cells.grid_width), np.random.default_rng(rng.getrandbits(64)))
+    if status is not None:
+        status.update(len(cells) - 1)
+
+
+def eller(height: int, width: int, rng: Random) -> Iterator[np.ndarray]:
+    """Eller's algorithm: yields grid rows from top to bottom keeping only O(width) state.
+
+    Enters are put into cell rows of the first and the last column, so rows never have to be revisited.
+    """
+    if height < 3 or width < 3 or not (is_odd(height) and is_odd(width)):
+        raise ValueError('Streaming generation needs odd height and width of at least 3.')
+
+    return _eller_rows(height, width, rng)
+
+
+def _eller_rows(height: int, width: int, rng: Random) -> Iterator[np.ndarray]:
+    cells_height, cells_width = (height - 1) // 2, (width - 1) // 2
+    enter_row = 2 * rng.randrange(cells_height) + 1
+    exit_row = 2 * rng.randrange(cells_height) + 1
+
+    wall_row = np.full(width, WALL, dtype=np.uint8)
+    yield wall_row.copy()
+
+    sets = [0] * cells_width
+    members = {}
+    next_set = 1
+    for y in range(cells_height):
+        last = y == cells_height - 1
+
+        for x in range(cells_width):
+            if not sets[x]:
+                sets[x] = next_set
+                members[next_set] = [x]
+                next_set += 1
+
+        row = wall_row.copy()
+        row[1::2] = EMPTY
+        for x in range(cells_width - 1):
+            left, right = sets[x], sets[x + 1]
+            if left == right or not (last or rng.random() < 0.5):
+                continue
+
+            if len(members[left]) < len(members[right]):
+                left, right = right, left
+            for member in members[right]:
+                sets[member] = left
+            members[left].extend(members.pop(right))
+            row[2 * x + 2] = EMPTY
+
+        if 2 * y + 1 == enter_row:
+            row[0] = ENTER
+        if 2 * y + 1 == exit_row:
+            row[-1] = ENTER
+        yield row
+
+        if last:
+            break
+
+        passage = wall_row.copy()
+        next_sets = [0] * cells_width
+        next_members = {}
+        for set_id, columns in members.items():
+            rng.shuffle(columns)
+            down = [column for i, column in enumerate(columns) if not i or rng.random() < 0.5]
+            for column in down:
+                next_sets[column] = set_id
+                passage[2 * column + 1] = EMPTY
+            next_members[set_id] = down
+        sets, members = next_sets, next_members
+        yield passage
+
+    yield wall_row
+
+
+GENERATORS = {
+    BACKTRACKER: backtracker,
+    KRUSKAL: kruskal,
+    PRIM: prim,
+    WILSON: wilson,
+    BINARY_TREE: binary_tree,
+    SIDEWINDER: sidewinder,
+}
+
+CARVERS = {
+    BINARY_TREE: carve_binary_tree,
+    SIDEWINDER: carve_sidewinder,
+}
@@ -1,63 +1,206 @@
-import uuid
+import struct
 from pathlib import Path
-from typing import Iterable, Iterator
-from tempfile import TemporaryDirectory
-
-import imageio
-from tqdm import tqdm
-from PIL import Image
+from typing import Iterable, BinaryIO, Optional, List, Tuple
+
+import numpy as np
+from PIL import Image, GifImagePlugin
+
+from .progress import Progress, ENCODE
+
+
+class GIFError(Exception):
+    pass
+
+
+class GIFWriter:
+    """Streaming GIF encoder.
+
+    Frames share the palette of the first frame when their colours fit in it. Such a frame
+    is written as the rectangle that changed since the previous frame, over the previous one
+    (disposal 1). Unchanged pixels inside the rectangle are made transparent when a free
+    palette index is given as transparency. Frames with other colours are written whole
+    with a local colour table of their own.
+    """
+
+    def __init__(self, file: BinaryIO, duration: int = 100, loop: int = 0, transparency: Optional[int] = None):
+        self.file = file
+        self.duration = duration
+        self.loop = loop
+        self.transparency = transparency
+        self.palette: Optional[Image.Image] = None
+        self.colors: Optional[np.ndarray] = None
+        self.indexes: Optional[np.ndarray] = None
+        self.previous: Optional[np.ndarray] = None
+        self.synced = False
+        self.pending: Optional[tuple] = None
+
+    def append(self, image: Image.Image, duration: int = None, box: Tuple[int, int, int, int] = None):
+        """Add frame, by default it is compared with the previous frame as a whole.
+
+        :param box: (left, top, right, bottom) rectangle holding every change since the previous frame,
+            only it is compared and encoded
+        """
+        duration = self.duration if duration is None else duration
+        if self.palette is None:
+            image = self.set_palette(image)
+            self.write_header(image)
+            self.pending = (image.copy(), (0, 0), duration, False)
+            self.previous = np.array(image)
+            self.synced = True
+            return
+
+        if not self.synced:
+            box = None
+        region = self.to_palette(image.crop(box) if box else image)
+        if region is None:
+            self.flush()
+            local = image.copy() if image.mode == 'P' else image.convert('P', palette=Image.ADAPTIVE)
+            self.pending = (local, (0, 0), duration, True)
+            self.synced = False
+            return
+
+        left, top, right, bottom = box or (0, 0, *image.size)
+        previous = self.previous[top:bottom, left:right]
+        changed = region != previous if self.synced else np.ones(region.shape, dtype=bool)
+        rows, cols = np.flatnonzero(changed.any(axis=1)), np.flatnonzero(changed.any(axis=0))
+        if not rows.size:
+            image, offset, pending_duration, local = self.pending
+            self.pending = (image, offset, pending_duration + duration, local)
+            return
+
+        self.flush()
+        y0, y1, x0, x1 = rows[0], rows[-1] + 1, cols[0], cols[-1] + 1
+        delta = region[y0:y1, x0:x1].copy()
+        if self.transparency is not None:
+            delta[~changed[y0:y1, x0:x1]] = self.transparency
+        delta_image = Image.fromarray(delta, 'P')
+        delta_image.putpalette(self.palette.getpalette())
+        self.pending = (delta_image, (int(left + x0), int(top + y0)), duration, False)
+        previous[...] = region
+        self.synced = True
+
+    def set_palette(self, image: Image.Image) -> Image.Image:
+        """Take the palette of the first frame as the global one."""
+        self.palette = image.copy() if image.mode == 'P' else image.convert('P', palette=Image.ADAPTIVE)
+        colors = np.array(self.palette.getpalette(), dtype=np.uint32).reshape(-1, 3)
+        self.colors, self.indexes = np.unique(colors[:, 0] << 16 | colors[:, 1] << 8 | colors[:, 2],
+                                              return_index=True)
+        return self.palette
+
+    def to_palette(self, image: Image.Image) -> Optional[np.ndarray]:
+        """Indexes of the frame in the global palette, None if some of its colours are not in it."""
+        if image.mode == 'P' and image.getpalette() == self.palette.getpalette():
+            return np.array(image)
+
+        pixels = np.asarray(image.convert('RGB'), dtype=np.uint32)
+        keys = pixels[:, :, 0] << 16 | pixels[:, :, 1] << 8 | pixels[:, :, 2]
+        found = np.minimum(np.searchsorted(self.colors, keys), len(self.colors) - 1)
+        if not (self.colors[found] == keys).all():
+            return None
+        return self.indexes[found].astype(np.uint8)
+
+    def write_header(self, image: Image.Image):
+        header, _ = GifImagePlugin.getheader(image.copy(), info={'optimize': False})
+        self.file.write(b''.join(header))
+        self.file.write(b'!\xff\x0bNETSCAPE2.0\x03\x01' + struct.pack('<H', self.loop) + b'\x00')
+
+    def flush(self):
+        if self.pending is None:
+            return
+
+        image, offset, duration, local = self.pending
+        params = {'duration': duration, 'disposal': 1}
+        if local:
+            params['include_color_table'] = True
+        elif self.transparency is not None:
+            params['transparency'] = self.transparency
+        self.file.write(b''.join(GifImagePlugin.getdata(image, offset, **params)))
+        self.pending = None
+
+    def close(self):
+        self.flush()
+        if self.palette is not None:
+            self.file.write(b';')
+        self.file.flush()
 
 
 class DynamicGIF:
-
-    def __init__(self, images: Iterable[Image.Image] = None):
-        self.temp_dir = TemporaryDirectory()
-        self.base_path = Path(self.temp_dir.name)
-        self.image_paths = list(self._save_images(images)) if images else []
-
-    def update(self, image: [Image.Image], index: int):
-        path = self._save_image(image)
-        self.image_paths[index] = path
-
-    def append(self, image: Image.Image):
-        path = self._save_image(image)
-        self.image_paths.append(path)
-
-    def pop(self, index: int) -> Path:
-        return self.image_paths.pop(index)
+    """GIF assembled from appended frames.
+
+    With a path frames are streamed straight into the encoder, only the last
+    frame is kept in memory. Without a path frames are buffered in memory
+    until save_gif, which is the only mode that supports update and pop.
+    """
+
+    def __init__(self, images: Iterable[Image.Image] = None, path: str = None, duration: int = 100,
+                 transparency: Optional[int] = None, progress: Progress = None):
+        self.duration = duration
+        self.transparency = transparency
+        self.progress = progress or Progress()
+        self.buffered = path is None
+        self.images: List[Image.Image] = []
+        self.durations: List[Optional[int]] = []
+        self.count = 0
+        self.file: Optional[BinaryIO] = None
+        self.writer: Optional[GIFWriter] = None
+
+        if not self.buffered:
+            self.file = open(Path(path).with_suffix('.gif'), 'wb')
+            self.writer = GIFWriter(self.file, duration, transparency=transparency)
+
+        for image in images or ():
+            self.append(image)
+
+    def update(self, image: Image.Image, index: int):
+        self.check_buffered()
+        self.images[index] = image
+
+    def append(self, image: Image.Image, duration: int = None, box: Tuple[int, int, int, int] = None):
+        """Add frame, box of changes is passed to the encoder in streaming mode and ignored when buffered."""
+        self.count += 1
+        if self.buffered:
+            self.images.append(image)
+            self.durations.append(duration)
+        else:
+            self.writer.append(image, duration, box)
+
+    def pop(self, index: int) -> Image.Image:
+        self.check_buffered()
+        self.count -= 1
+        self.durations.pop(index)
+        return self.images.pop(index)
 
     def save_gif(self, path: str):
+        self.check_buffered()
         path = Path(path).with_suffix('.gif')
-        status = tqdm(total=len(self), desc='Saving GIF', unit='Image')
-        with imageio.get_writer(path) as writer:
-            for path in self.image_paths:
-                image = imageio.imread(path)
-                writer.append_data(image)
-
+        with open(path, 'wb') as file, self.progress.span(ENCODE, len(self)) as status:
+            writer = GIFWriter(file, self.duration, transparency=self.transparency)
+            for image, duration in zip(self.images, self.durations):
+                writer.append(image, duration)
                 status.update()
+            writer.close()
 
-    def clear(self):
-        self.image_paths = []
-        self.temp_dir.cleanup()
-
-    def _save_image(self, image: Image.Image) -> Path:
-        image_name = self._create_image_name()
-        path = self.base_path.with_name(image_name).with_suffix('.jpg')
-        image.save(path)
-        return path
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.file.close()
+            self.writer = None
 
-    def _save_images(self, images: Iterable[Image.Image]) -> Iterator[Path]:
-        return map(self._save_image, images)
+    def clear(self):
+        self.images = []
+        self.durations = []
+        self.count = 0
 
-    @staticmethod
-    def _create_image_name() -> str:
-        return str(uuid.uuid4())
+    def check_buffered(self):
+        if not self.buffered:
+            raise GIFError('Frames can be changed only in buffered mode (without path).')
 
     def __len__(self):
-        return len(self.image_paths)
+        return self.count
 
     def __enter__(self):
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
         self.clear()
@@ -1,58 +1,138 @@
+from io import BytesIO
 from pathlib import Path
-from typing import Iterable, Iterator, Tuple
+from typing import BinaryIO, Union, Iterable, Iterator
 
 import numpy as np
 from PIL import Image
 
+from .png import PNGWriter
+from .utils import Coord, row_blocks
+from .progress import Progress, RENDER, ENCODE
+from .settings import COLORS, JPEG, PNG, WEBP, IMAGE_SUFFIXES
+
+
+PALETTE = np.array([COLORS[cell] for cell in sorted(COLORS)], dtype=np.uint8)
+TRANSPARENT = len(PALETTE)
+STRIP_PIXELS = 1 << 22
+
+SAVE_OPTIONS = {
+    JPEG: {},
+    PNG: {},
+    WEBP: {'lossless': True},
+}
+
 
 class ImageSheet:
 
-    def __init__(self, images: Iterable[Iterator[np.ndarray]]):
-        self.images = np.array(images)
+    def __init__(self, cells: np.ndarray, block_size: int = 64, palette: np.ndarray = PALETTE,
+                 progress: Progress = None):
+        if block_size < 1:
+            raise ValueError(f'Block size : {block_size} is not supported.')
+
+        self.cells = cells
+        self.block_size = block_size
+        self.palette = palette
+        self.progress = progress or Progress()
+
+    def render(self) -> np.ndarray:
+        """Map cells through the palette and upscale every cell to a block in one pass."""
+        pixels = self.palette[self.cells]
+        return pixels.repeat(self.block_size, axis=0).repeat(self.block_size, axis=1)
 
-    def create_sheet(self) -> Image.Image:
-        rows, columns, h_image, w_image, _ = self.images.shape
-        sheet = Image.new('RGB', (h_image * rows, w_image * columns))
-        for y, group in enumerate(self):
-            for x, image_array in enumerate(group):
-                image_array = (image_array * 255)
-                image = Image.fromarray(image_array)
-                sheet.paste(image, (x * w_image, y * h_image))
+    def render_indexes(self) -> np.ndarray:
+        """Upscale cells to blocks keeping cell codes as palette indexes."""
+        return self.cells.repeat(self.block_size, axis=0).repeat(self.block_size, axis=1)
 
+    def create_sheet(self, image_format: str = JPEG) -> Image.Image:
+        """Palette ('P' mode) image for lossless formats, RGB image for JPEG."""
+        with self.progress.span(RENDER, self.cells.size) as status:
+            if image_format == JPEG:
+                sheet = Image.fromarray(self.render(), 'RGB')
+            else:
+                sheet = self.to_image(self.render_indexes())
+            status.update(self.cells.size)
         return sheet
 
-    def save_to_image(self, path: str):
+    def to_image(self, indexes: np.ndarray) -> Image.Image:
+        image = Image.fromarray(indexes, 'P')
+        image.putpalette(self.palette.tobytes())
+        return image
+
+    def paint(self, frame: np.ndarray, coord: Coord):
+        """Repaint in rendered indexes the block of the cell at coord."""
+        x, y = coord.normalize(self.cells.shape)
+        size = self.block_size
+        frame[y * size:(y + 1) * size, x * size:(x + 1) * size] = self.cells[y, x]
+
+    def save_to_image(self, path: str, image_format: str = JPEG):
         path = Path(path)
         path.parent.mkdir(exist_ok=True, parents=True)
-        sheet = self.create_sheet()
-        sheet.save(path.with_suffix('.jpg'))
+        self.save(path.with_suffix(self.get_suffix(image_format)), image_format)
+
+    def save_to_bytes_io(self, image_format: str = JPEG) -> BytesIO:
+        image_io = BytesIO()
+        self.save(image_io, image_format)
+        image_io.seek(0)
+        return image_io
+
+    def render_strips(self, pixels: int = STRIP_PIXELS) -> Iterator[np.ndarray]:
+        """Rendered indexes by horizontal strips of whole rows of cells, about pixels each."""
+        for _, rows in row_blocks(self.cells, pixels // self.block_size ** 2):
+            yield rows.repeat(self.block_size, axis=0).repeat(self.block_size, axis=1)
+
+    def save_png(self, file: Union[Path, BinaryIO]):
+        """PNG rendered and encoded strip by strip, the whole bitmap is never allocated."""
+        height, width = self.cells.shape
+        with self.progress.span(ENCODE, self.cells.size) as status:
+            self.write_png(file, (strip for _, strip in row_blocks(self.cells)), height, width, self.block_size,
+                           self.palette, status)
+
+    @staticmethod
+    def write_png(file: Union[Path, BinaryIO], blocks: Iterable[np.ndarray], height: int, width: int,
+                  block_size: int, palette: np.ndarray = PALETTE, status=None):
+        """Stream PNG of height x width cells coming as blocks of rows, e.g. rows of Labyrinth.generate_rows."""
+        if isinstance(file, Path):
+            with open(file, 'wb') as opened:
+                return ImageSheet.write_png(opened, blocks, height, width, block_size, palette, status)
+
+        writer = PNGWriter(file, width * block_size, height * block_size, palette)
+        for block in blocks:
+            sheet = ImageSheet(np.atleast_2d(block), block_size, palette)
+            for strip in sheet.render_strips():
+                writer.write(strip)
+            if status is not None:
+                status.update(sheet.cells.size)
+        writer.close()
+
+    def save(self, file: Union[Path, BinaryIO], image_format: str = JPEG):
+        self.get_suffix(image_format)
+        if image_format == PNG:
+            return self.save_png(file)
+
+        sheet = self.create_sheet(image_format)
+        with self.progress.span(ENCODE, self.cells.size) as status:
+            sheet.save(file, image_format, **SAVE_OPTIONS[image_format])
+            status.update(self.cells.size)
 
     def show(self, title: str):
         sheet = self.create_sheet()
         sheet.show(title)
 
-    @classmethod
-    def generate_black(cls, size: Tuple[int, int]) -> np.ndarray:
-        return cls.generate_blank(*size)
-
-    @classmethod
-    def generate_white(cls, size: Tuple[int, int]) -> np.ndarray:
-        return cls.generate_blank(*size, rgb_color=(1, 1, 1))
-
     @staticmethod
-    def generate_blank(width: int, height: int, rgb_color: Tuple[int, int, int] = (0, 0, 0)) -> np.ndarray:
-        image = np.zeros((height, width, 3), np.uint8)
-        image[:] = rgb_color
-        return image
+    def get_suffix(image_format: str) -> str:
+        try:
+            return IMAGE_SUFFIXES[image_format]
+        except KeyError:
+            raise ValueError(f'Image format : {image_format} is not supported.')
 
     def __iter__(self):
-        return iter(self.images)
+        return iter(self.cells)
 
     def __getitem__(self, index):
-        return self.images[index]
+        return self.cells[index]
 
     def __setitem__(self, key, value):
-        self.images[key] = value
+        self.cells[key] = value
 
     def __len__(self):
-        return len(self.images)
+        return len(self.cells)
@@ -1,20 +1,27 @@
+import os
 import math
 import logging
 from io import BytesIO
-from random import choice
-from collections import deque
-from operator import attrgetter, itemgetter
-from typing import List, overload, Union, Iterable
+from pathlib import Path
+from random import Random
+from itertools import repeat
+from operator import attrgetter
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, overload, Union, Iterable, Iterator, Optional, Callable, Tuple
 
 import numpy as np
 from PIL import Image
-from tqdm import tqdm
 
 from .matrix import Matrix
+from .generators import CellGrid, GENERATORS, CARVERS, eller
 from .gif import DynamicGIF
-from .utils import is_even, Coord
-from .image_sheet import ImageSheet
-from .settings import WALL, VISITED, ENTER, EMPTY, SUPPORT_EXTENSIONS
+from .utils import is_even, get_rng, row_blocks, Coord
+from .image_sheet import ImageSheet, TRANSPARENT
+from .progress import Progress, GENERATE, SOLVE, RENDER, ENCODE, RECOGNIZE
+from .packing import pack, unpack, Buffer
+from .tree_index import TreeIndex
+from .settings import (WALL, ENTER, EMPTY, SYMBOLS, SUPPORT_EXTENSIONS, BACKTRACKER, BINARY_TREE, BFS, STRATEGIES, JPEG,
+                       IMAGE_SUFFIXES, MIN_FRAME_DELAY)
 
 
 class LabyrinthError(Exception):
@@ -23,57 +30,286 @@ class LabyrinthError(Exception):
 
 class Labyrinth:
 
-    def __init__(self, height: int = 5, width: int = 5, lab: Iterable[Iterable[str]] = None):
+    def __init__(self, height: int = 5, width: int = 5, lab: Iterable[Iterable[int]] = None,
+                 progress: Progress = None):
         self._height = height
         self._width = width
+        self.seed: Optional[int] = None
+        self.scratch: Optional[str] = None
+        self.progress = progress or Progress()
         self.logger = logging.getLogger(type(self).__name__)
 
-        self._labyrinth = []
-        if lab is not None:
-            self._labyrinth = np.array(lab)
-
-        if not lab:
+        if lab is None:
             self.generate_empty()
+        else:
+            self._attach(np.array(lab, dtype=np.uint8))
 
-    def generate_empty(self):
-        self._labyrinth = np.array([
-            [self.get_cell(col, row) for col in range(self._width)]
-            for row in range(self._height)
-        ])
+    @classmethod
+    def from_memmap(cls, path: str, height: int = None, width: int = None, scratch: str = None,
+                    progress: Progress = None) -> 'Labyrinth':
+        """Labyrinth with cells kept in a .npy file mapped to memory, for grids larger than RAM.
+
+        :param path: file of cells, created empty when height and width are given, opened otherwise
+        :param scratch: directory for temporary files of solvers, the directory of path by default
+        """
+        if height is None or width is None:
+            cells = np.lib.format.open_memmap(path, mode='r+')
+            if cells.dtype != np.uint8 or cells.ndim != 2:
+                raise LabyrinthError(f'{path} is not a grid of cells.')
+            lab = cls(0, 0, progress=progress)
+            lab._attach(cells)
+        else:
+            cells = np.lib.format.open_memmap(path, mode='w+', dtype=np.uint8, shape=(height, width))
+            lab = cls(0, 0, progress=progress)
+            lab._attach(cells)
+            lab.clear()
 
-    def generate(self, start_coord: Coord = Coord(1, 1)):
+        lab.scratch = scratch or os.path.dirname(os.path.abspath(path))
+        return lab
 
-        matrix = self.get_matrix()
-        matrix.visit(start_coord)
-
-        current_coord = start_coord
-        coords_queue = deque()
-        status = tqdm(total=len(matrix.get_not_visited()), desc='Lab generating', unit='Cell')
-        while matrix.get_not_visited():
-            neighborhood = current_coord.neighborhood(2)
-            neighborhood = filter(self.is_legal, neighborhood)
-            not_visited_neighborhood = list(filter(matrix.is_not_visited, neighborhood))
-
-            if not_visited_neighborhood:
-                coords_queue.append(current_coord)
-                neighbor = choice(not_visited_neighborhood)
-                self.remove_wall_between(current_coord, neighbor)
-                matrix.visit(neighbor)
-                status.update()
-                current_coord = neighbor
-            elif coords_queue:
-                current_coord = coords_queue.popleft()
-            else:
-                not_visited = matrix.get_not_visited()
-                current_coord = choice(not_visited)
-                matrix.visit(current_coord)
+    def _attach(self, cells: np.ndarray):
+        """Use cells as they are, without a copy."""
+        self._labyrinth = cells
+        self._height, self._width = cells.shape
+
+    def flush(self):
+        """Write changes of mapped cells to the file."""
+        if isinstance(self._labyrinth, np.memmap):
+            self._labyrinth.flush()
+
+    def generate_empty(self):
+        self._labyrinth = np.empty((self._height, self._width), dtype=np.uint8)
+        self.clear()
+
+    def clear(self):
+        """Walls around every cell, filled by blocks of rows."""
+        for start, rows in row_blocks(self._labyrinth):
+            rows[:] = WALL
+            rows[1 - start % 2::2, 1::2] = EMPTY
+
+    def generate(self, start_coord: Coord = Coord(1, 1), algorithm: str = BACKTRACKER, seed: int = None,
+                 rng: Random = None):
+        """Generate perfect labyrinth.
+
+        :param start_coord: cell where generation starts
+        :param algorithm: one of ALGORITHMS
+        :param seed: seed of own random generator, same seed gives same labyrinth
+        :param rng: random generator to use instead of seed
+        """
+        rng = get_rng(seed, rng)
+        self.seed = seed
+        try:
+            generator = GENERATORS[algorithm]
+        except KeyError:
+            raise LabyrinthError(f'Algorithm : {algorithm} is not supported.')
+
+        cells = CellGrid(self._labyrinth)
+        try:
+            start = cells.index(start_coord)
+        except ValueError as err:
+            raise LabyrinthError(err)
+
+        with self.progress.span(GENERATE, len(cells) - 1) as status:
+            generator(cells, rng, start, status)
+
+        self.create_enter(0, rng)
+        self.create_enter(-1, rng)
+
+    def generate_streaming(self, seed: int = None, rng: Random = None):
+        """Generate perfect labyrinth row by row with Eller's algorithm, keeping only O(width) state.
+
+        Suits grids mapped with from_memmap, rows are written straight into the cells.
+        """
+        rows = self.generate_rows(self._height, self._width, seed, rng)
+        self.seed = seed
+        with self.progress.span(GENERATE, self._height) as status:
+            for y, row in enumerate(rows):
+                self._labyrinth[y] = row
                 status.update()
 
-        self.create_enter(0)
-        self.create_enter(-1)
+    def generate_tiled(self, tile_size: int = 256, algorithm: str = BACKTRACKER, seed: int = None,
+                       rng: Random = None, workers: int = None):
+        """Generate perfect labyrinth from tiles generated in a pool of processes.
+
+        Every tile is a perfect labyrinth of at most tile_size x tile_size cells. Tiles are joined by one
+        passage per edge of a random spanning tree over the grid of tiles, so the whole labyrinth stays perfect.
+
+        :param tile_size: side of a tile in cells
+        :param workers: count of processes, all cores if None, 1 generates in this process
+        """
+        rng = get_rng(seed, rng)
+        self.seed = seed
+        if algorithm not in GENERATORS:
+            raise LabyrinthError(f'Algorithm : {algorithm} is not supported.')
+
+        cells = CellGrid(self._labyrinth)
+        if not len(cells):
+            raise LabyrinthError('Labyrinth has no cells.')
+
+        rows = self._split(cells.height, tile_size)
+        cols = self._split(cells.width, tile_size)
+        tiles = [(y0, y1, x0, x1) for y0, y1 in rows for x0, x1 in cols]
+        seeds = [rng.getrandbits(64) for _ in tiles]
+        packed = self._map(self._generate_tile, workers, self.progress, GENERATE,
+                           [y1 - y0 for y0, y1, _, _ in tiles], [x1 - x0 for _, _, x0, x1 in tiles],
+                           repeat(algorithm), seeds)
+        for (y0, y1, x0, x1), data in zip(tiles, packed):
+            self._labyrinth[2 * y0:2 * y1 + 1, 2 * x0:2 * x1 + 1] = unpack(data)[0]
+
+        tree = Labyrinth(2 * len(rows) + 1, 2 * len(cols) + 1)
+        tree_cells = CellGrid(tree[:])
+        GENERATORS[algorithm](tree_cells, rng, tree_cells.index(Coord(1, 1)))
+        for i, (y0, y1) in enumerate(rows):
+            for j, (x0, x1) in enumerate(cols):
+                if j + 1 < len(cols) and tree[2 * i + 1, 2 * j + 2] == EMPTY:
+                    self._labyrinth[2 * rng.randrange(y0, y1) + 1, 2 * x1] = EMPTY
+                if i + 1 < len(rows) and tree[2 * i + 2, 2 * j + 1] == EMPTY:
+                    self._labyrinth[2 * y1, 2 * rng.randrange(x0, x1) + 1] = EMPTY
+
+        self.create_enter(0, rng)
+        self.create_enter(-1, rng)
+
+    @staticmethod
+    def _split(size: int, part: int) -> List[tuple]:
+        """Bounds of nearly equal parts of range(size), no longer than part."""
+        count = -(-size // max(part, 1))
+        bounds = [size * k // count for k in range(count + 1)]
+        return list(zip(bounds, bounds[1:]))
+
+    @staticmethod
+    def _generate_tile(height: int, width: int, algorithm: str, seed: int) -> bytes:
+        tile = Labyrinth(2 * height + 1, 2 * width + 1)
+        cells = CellGrid(tile[:])
+        GENERATORS[algorithm](cells, Random(seed), cells.index(Coord(1, 1)))
+        return tile.to_bytes()
+
+    @staticmethod
+    def generate_stack(k: int, height: int, width: int, algorithm: str = BINARY_TREE, seed: int = None,
+                       rng: Random = None) -> np.ndarray:
+        """Generate k labyrinths at once as a (k, height, width) array of cells, enters included.
+
+        :param algorithm: one of vectorized algorithms, BINARY_TREE or SIDEWINDER
+        """
+        try:
+            carver = CARVERS[algorithm]
+        except KeyError:
+            raise LabyrinthError(f'Algorithm : {algorithm} can not generate stacks.')
+        if height < 3 or width < 3 or is_even(height) or is_even(width):
+            raise LabyrinthError('Stacks need odd height and width of at least 3.')
+
+        generator = np.random.default_rng(get_rng(seed, rng).getrandbits(64))
+        stack = np.full((k, height, width), WALL, dtype=np.uint8)
+        stack[:, 1::2, 1::2] = EMPTY
+        carver(stack, generator)
+
+        mazes = np.arange(k)
+        for col, inner in ((0, 1), (-1, -2)):
+            keys = np.where(stack[:, :, inner] == EMPTY, generator.random((k, height)), -1)
+            stack[mazes, keys.argmax(axis=1), col] = ENTER
+        return stack
+
+    @classmethod
+    def generate_many(cls, n: int, height: int, width: int, algorithm: str = BACKTRACKER, seed: int = None,
+                      workers: int = None, progress: Progress = None) -> List['Labyrinth']:
+        """Generate n labyrinths in a pool of processes, results come back bit-packed.
+
+        :param seed: seed of the batch, every labyrinth gets its own seed drawn from it
+        :param workers: count of processes, all cores if None, 1 generates in this process
+        """
+        rng = get_rng(seed)
+        seeds = [rng.getrandbits(64) for _ in range(n)]
+        packed = cls._map(cls._generate_packed, workers, progress, GENERATE,
+                          repeat(height), repeat(width), repeat(algorithm), seeds)
+        return [cls.from_bytes(data, progress) for data in packed]
+
+    @classmethod
+    def solve_many(cls, labyrinths: Iterable['Labyrinth'], strategy: str = BFS, workers: int = None,
+                   progress: Progress = None) -> List['Labyrinth']:
+        """Solved copies of labyrinths, solved in a pool of processes."""
+        if strategy not in STRATEGIES:
+            raise LabyrinthError(f'Strategy : {strategy} is not supported.')
+
+        data = [lab.to_bytes() for lab in labyrinths]
+        packed = cls._map(cls._solve_packed, workers, progress, SOLVE, data, repeat(strategy))
+        return [cls.from_bytes(solved, progress) for solved in packed]
+
+    @classmethod
+    def render_many(cls, labyrinths: Iterable['Labyrinth'], block_size: int = 64, image_format: str = JPEG,
+                    workers: int = None, progress: Progress = None) -> List[bytes]:
+        """Encoded images of labyrinths, rendered in a pool of processes."""
+        if image_format not in IMAGE_SUFFIXES:
+            raise LabyrinthError(f'Image format : {image_format} is not supported.')
+
+        data = [lab.to_bytes() for lab in labyrinths]
+        return cls._map(cls._render_packed, workers, progress, RENDER, data, repeat(block_size), repeat(image_format))
+
+    @staticmethod
+    def _map(function: Callable, workers: Optional[int], progress: Optional[Progress], stage: str,
+             *iterables: Iterable) -> list:
+        """Results of function over zipped iterables in order, computed by a pool of workers processes."""
+        progress = progress or Progress()
+        workers = workers or os.cpu_count() or 1
+        jobs = list(zip(*iterables))
+        results = []
+        with progress.span(stage, len(jobs)) as status:
+            if workers == 1 or len(jobs) <= 1:
+                for args in jobs:
+                    results.append(function(*args))
+                    status.update()
+                return results
+
+            with ProcessPoolExecutor(workers) as executor:
+                chunksize = max(len(jobs) // (4 * workers), 1)
+                for result in executor.map(function, *zip(*jobs), chunksize=chunksize):
+                    results.append(result)
+                    status.update()
+        return results
+
+    @staticmethod
+    def _generate_packed(height: int, width: int, algorithm: str, seed: int) -> bytes:
+        lab = Labyrinth(height, width)
+        lab.generate(algorithm=algorithm, seed=seed)
+        return lab.to_bytes()
+
+    @staticmethod
+    def _solve_packed(data: bytes, strategy: str) -> bytes:
+        lab = Labyrinth.from_bytes(data)
+        lab.solve(strategy=strategy)
+        return lab.to_bytes()
+
+    @staticmethod
+    def _render_packed(data: bytes, block_size: int, image_format: str) -> bytes:
+        return Labyrinth.from_bytes(data).save_as_bytes_io(block_size, image_format).getvalue()
+
+    @staticmethod
+    def generate_rows(height: int, width: int, seed: int = None, rng: Random = None) -> Iterator[np.ndarray]:
+        try:
+            return eller(height, width, get_rng(seed, rng))
+        except ValueError as err:
+            raise LabyrinthError(err)
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[np.ndarray]) -> 'Labyrinth':
+        lab = np.array(list(rows), dtype=np.uint8)
+        return cls(*lab.shape, lab=lab)
+
+    @staticmethod
+    def save_rows(rows: Iterable[np.ndarray], path: str):
+        with open(path, 'w', encoding='utf-8') as file:
+            for row in rows:
+                file.write(''.join(SYMBOLS[cell] for cell in row.tolist()))
+                file.write('\n')
+
+    @staticmethod
+    def save_rows_as_png(rows: Iterable[np.ndarray], path: str, height: int, width: int, block_size: int = 64):
+        """Stream PNG of rows, e.g. of generate_rows, holding neither the labyrinth nor its bitmap."""
+        try:
+            ImageSheet.write_png(Path(path), rows, height, width, block_size)
+        except ValueError as err:
+            raise LabyrinthError(err)
 
     def is_wall(self, coord: Coord) -> bool:
-        return self[coord] in [WALL, VISITED]
+        return self[coord] == WALL
 
     def is_empty(self, coord: Coord) -> bool:
         return not self.is_wall(coord)
@@ -96,84 +332,134 @@ class Labyrinth:
         self[mid_coord] = EMPTY
 
     def generate_image(self, block_size: int = 64) -> ImageSheet:
-        image_shape = (block_size, block_size)
-        white_image = ImageSheet.generate_white(image_shape)
-        black_image = ImageSheet.generate_black(image_shape)
-        red_image = ImageSheet.generate_blank(block_size, block_size, (1, 0, 0))
-
-        image_mapping = {
-            EMPTY: white_image,
-            WALL: black_image,
-            ENTER: red_image,
-        }
-
-        images = [
-            [image_mapping[el] for el in row]
-            for row in self
-        ]
-
-        sheet = ImageSheet(images)
-        return sheet
-
-    def save_as_image(self, path: str, block_size: int = 64):
+        return ImageSheet(self._labyrinth, block_size, progress=self.progress)
+
+    def save_as_image(self, path: str, block_size: int = 64, image_format: str = JPEG):
         sheet = self.generate_image(block_size)
-        sheet.save_to_image(path)
+        sheet.save_to_image(path, image_format)
 
-    def save_as_bytes_io(self, block_size: int = 64) -> BytesIO:
+    def save_as_bytes_io(self, block_size: int = 64, image_format: str = JPEG) -> BytesIO:
         sheet = self.generate_image(block_size)
-        image = sheet.create_sheet()
-        image_io = BytesIO()
-        image.save(image_io, 'JPEG')
-        image_io.seek(0)
+        return sheet.save_to_bytes_io(image_format)
+
+    def to_bytes(self) -> bytes:
+        """Packed walls, enters and seed, see labirinth.packing for the layout."""
+        try:
+            return pack(self._labyrinth, self.seed)
+        except ValueError as err:
+            raise LabyrinthError(err)
 
-        return image_io
+    def save_as_binary(self, path: str):
+        with open(path, 'wb') as file:
+            file.write(self.to_bytes())
+
+    @classmethod
+    def from_bytes(cls, data: Buffer, progress: Progress = None) -> 'Labyrinth':
+        try:
+            cells, seed = unpack(data)
+        except ValueError as err:
+            raise LabyrinthError(err)
+
+        lab = cls(*cells.shape, lab=cells, progress=progress)
+        lab.seed = seed
+        return lab
+
+    @classmethod
+    def from_binary(cls, path: str, progress: Progress = None) -> 'Labyrinth':
+        """Load packed labyrinth, the file is mapped and wall bits are unpacked straight from it."""
+        return cls.from_bytes(np.memmap(path, dtype=np.uint8, mode='r'), progress)
 
     def show(self, block_size: int = 64, title: str = 'Labyrinth'):
         sheet = self.generate_image(block_size)
         sheet.show(title)
 
-    def create_enter(self, col: int) -> Coord:
-        lab = [row[1:-1] for row in self]
-        column = map(itemgetter(col), lab)
-        empty_cell = [i for i, cell in enumerate(column) if cell == EMPTY]
-        row_idx = choice(empty_cell)
+    def create_enter(self, col: int, rng: Random = None) -> Coord:
+        column = self._labyrinth[:, 1:-1][:, col]
+        empty_cell = np.flatnonzero(column == EMPTY).tolist()
+        row_idx = get_rng(rng=rng).choice(empty_cell)
         cord_enter = Coord(col, row_idx)
         self[cord_enter] = ENTER
         return cord_enter
 
-    def find_enter(self, col: int) -> Coord:
-
-        for y, row in enumerate(self._labyrinth):
-            for x, el in enumerate(row):
-                if el == ENTER:
-                    coord = Coord(x, y)
-                    self[coord] = EMPTY
-                    return coord
+    def find_enter(self, col: int, exclude: Coord = None) -> Coord:
+        """Enter closest to the column col, it is left marked so the labyrinth can be solved again.
+
+        An enter is created in the column when there is none.
+        """
+        target = Coord(col, 0).normalize(self._labyrinth.shape).x
+        found = None
+        for start, rows in row_blocks(self._labyrinth):
+            ys, xs = np.nonzero(rows == ENTER)
+            if exclude is not None:
+                keep = (ys + start != exclude.y) | (xs != exclude.x)
+                ys, xs = ys[keep], xs[keep]
+            if not xs.size:
+                continue
+
+            i = int(np.abs(xs - target).argmin())
+            distance = abs(int(xs[i]) - target)
+            if found is None or distance < found[0]:
+                found = (distance, Coord(int(xs[i]), start + int(ys[i])))
+
+        if found is not None:
+            return found[1]
 
         self.logger.debug(f'Enter not found.')
         return self.create_enter(col)
 
-    def solve(self, enter_col: int = 0, exit_col: int = -1):
-        way = self.get_solved_way(enter_col, exit_col)
+    def solve(self, enter_col: int = 0, exit_col: int = -1, strategy: str = BFS):
+        way = self.get_solved_way(enter_col, exit_col, strategy)
         self.mark_solve_from_way(way)
 
-    def solve_with_gif(self, path: str, block_size: int = 8, enter_col: int = 0, exit_col: int = -1):
+    def solve_with_gif(self, path: str, block_size: int = 8, enter_col: int = 0, exit_col: int = -1,
+                       strategy: str = BFS, max_frames: int = None, steps_per_frame: int = 1,
+                       duration: float = None):
+        """Animate the solution, several steps of the way can be merged into one frame.
+
+        :param max_frames: upper bound of frames, steps per frame grow to fit it
+        :param steps_per_frame: minimal count of way steps drawn in one frame
+        :param duration: playback length in seconds, frames are merged to keep delays playable
+        """
+        way = self.get_solved_way(enter_col, exit_col, strategy)
+
+        steps_per_frame = max(steps_per_frame, 1)
+        if max_frames:
+            steps_per_frame = max(steps_per_frame, math.ceil(len(way) / max_frames))
+        if duration:
+            frames_budget = max(int(duration * 1000) // MIN_FRAME_DELAY, 1)
+            steps_per_frame = max(steps_per_frame, math.ceil(len(way) / frames_budget))
+        frames = math.ceil(len(way) / steps_per_frame)
+
+        sheet = self.generate_image(block_size)
+        frame = sheet.render_indexes()
+        with DynamicGIF(path=path, transparency=TRANSPARENT) as gif, self.progress.span(ENCODE, frames) as status:
+            for i in range(frames):
+                steps = way[i * steps_per_frame:(i + 1) * steps_per_frame]
+                self.mark_solve_from_way(steps)
+                for coord in steps:
+                    sheet.paint(frame, coord)
+
+                delay = None
+                if duration:
+                    centiseconds = round(duration * 100)
+                    delay = 10 * (centiseconds * (i + 1) // frames - centiseconds * i // frames)
+                gif.append(sheet.to_image(frame), delay, self.get_box(steps, block_size))
+                status.update()
 
-        way = self.get_solved_way(enter_col, exit_col)
+    def get_box(self, coords: Iterable[Coord], block_size: int) -> Tuple[int, int, int, int]:
+        """Pixel rectangle (left, top, right, bottom) of the blocks of cells at coords."""
+        coords = [coord.normalize(self._labyrinth.shape) for coord in coords]
+        xs, ys = [coord.x for coord in coords], [coord.y for coord in coords]
+        return min(xs) * block_size, min(ys) * block_size, (max(xs) + 1) * block_size, (max(ys) + 1) * block_size
 
-        with DynamicGIF() as gif:
-            for coord in tqdm(way, desc='Creating GIF', unit='Image'):
-                self.mark_solve_from_way([coord])
-                sheet = self.generate_image(block_size)
-                snapshot = sheet.create_sheet()
-                gif.append(snapshot)
-            gif.save_gif(path)
+    def get_solved_way(self, enter_col: int = 0, exit_col: int = -1, strategy: str = BFS) -> List[Coord]:
+        if strategy not in STRATEGIES:
+            raise LabyrinthError(f'Strategy : {strategy} is not supported.')
 
-    def get_solved_way(self, enter_col: int = 0, exit_col: int = -1) -> List[Coord]:
         matrix = self.get_matrix()
         start = self.find_enter(enter_col)
-        end = self.find_enter(exit_col)
-        way = [start, *matrix.bfs(start, end), end]
+        end = self.find_enter(exit_col, exclude=start)
+        way = [start, *matrix.solve(start, end, strategy), end]
         return way
 
     def mark_solve_from_way(self, way: Iterable[Coord]):
@@ -181,95 +467,94 @@ class Labyrinth:
             self[coord] = ENTER
 
     def get_matrix(self) -> Matrix:
-        matrix = Matrix([
-            [1 if el == WALL else 0 for el in row]
-            for row in self._labyrinth
-        ])
+        """Matrix sharing cells with the labyrinth, walls are its VISITED cells."""
+        matrix = Matrix(self._labyrinth, self.progress, self.scratch)
         return matrix
 
+    def build_index(self, root: Coord = None) -> TreeIndex:
+        """Tree of open cells answering way and distance queries without a search per query."""
+        try:
+            return TreeIndex(self.get_matrix(), root)
+        except ValueError as err:
+            raise LabyrinthError(err)
+
     @staticmethod
-    def get_cell(col: int, row: int) -> str:
+    def get_cell(col: int, row: int) -> int:
         if is_even(row) or is_even(col):
             return WALL
         return EMPTY
 
     @classmethod
-    def from_pil_image(cls, image: Image.Image) -> 'Labyrinth':
-        image = image.convert('RGB')
-        w, h = image.size
-        binary = image.point(lambda p: p > 128)
-        array = np.array(binary)
-        block_size = cls.recognize_block_size(array)
-        lab = np.array([
-            [
-                cls.get_element(array[i: i + block_size, j: j + block_size])
-                for j in range(0, h, block_size)
-            ]
-            for i in range(0, w, block_size)
-        ])
-        return Labyrinth(*lab.shape, lab=list(lab))
+    def from_pil_image(cls, image: Image.Image, progress: Progress = None) -> 'Labyrinth':
+        progress = progress or Progress()
+        with progress.span(RECOGNIZE) as status:
+            image = image.convert('RGB')
+            array = np.asarray(image) > 128
+            block_size = cls.recognize_block_size(array)
+            h, w = array.shape[:2]
+            rows, cols = h // block_size, w // block_size
+            blocks = array[:rows * block_size, :cols * block_size].reshape(rows, block_size, cols, block_size, 3)
+            lab = cls.get_elements(blocks.any(axis=(1, 3)))
+            status.update(lab.size)
+        return Labyrinth(*lab.shape, lab=lab, progress=progress)
 
     @classmethod
-    def from_image(cls, path: str) -> 'Labyrinth':
+    def from_image(cls, path: str, progress: Progress = None) -> 'Labyrinth':
         image: Image.Image = Image.open(path)
-        return cls.from_pil_image(image)
+        return cls.from_pil_image(image, progress)
 
     @staticmethod
-    def get_element(image: np.ndarray) -> str:
-        if all(image[:, :, i].any() for i in range(3)):
-            return EMPTY
-        elif image[:, :, :1].any():
-            return ENTER
-        else:
-            return WALL
+    def get_elements(channels: np.ndarray) -> np.ndarray:
+        """Cells from the (rows, cols, 3) flags of blocks having any lit pixel in a channel."""
+        lab = np.full(channels.shape[:2], WALL, dtype=np.uint8)
+        lab[channels[:, :, 0]] = ENTER
+        lab[channels.all(axis=2)] = EMPTY
+        return lab
 
     @staticmethod
     def recognize_block_size(array: np.ndarray) -> int:
-        block_size = math.inf
-        counter = 0
+        """The shortest run of equal pixels along the rows of the image."""
+        changes = array[:, 1:] != array[:, :-1]
+        if changes.ndim == 3:
+            changes = changes.any(axis=2)
+
         h, w = array.shape[:2]
-        with tqdm(total=h * w, desc='Recognize blocks size.') as status:
-            for row in array:
-                previous: np.ndarray = row[0]
-                for current in row:
-                    if np.ndarray.all(current == previous):
-                        counter += 1
-                    else:
-                        block_size = min(block_size, counter)
-                        counter = 1
-                    previous = current
-                    status.update()
-                else:
-                    block_size = min(block_size, counter)
-                    counter = 0
+        bounds = np.ones((h, w + 1), dtype=bool)
+        bounds[:, 1:-1] = changes
+        starts = np.flatnonzero(bounds)
+        runs = np.diff(starts)[starts[:-1] % (w + 1) != w]
 
-        if block_size == math.inf:
+        if not runs.size:
             raise LabyrinthError('Can not recognize block_size.')
 
+        block_size = int(runs.min())
         if block_size not in SUPPORT_EXTENSIONS:
             raise LabyrinthError(f'Block size : {block_size} is not supported.')
 
         return block_size
 
     def __str__(self):
-        return str('\n'.join(map(str, self._labyrinth)))
+        return '\n'.join(
+            ''.join(SYMBOLS[cell] for cell in row)
+            for row in self._labyrinth.tolist()
+        )
 
     @overload
-    def __getitem__(self, index: Coord) -> str: ...
+    def __getitem__(self, index: Coord) -> int: ...
 
     @overload
-    def __getitem__(self, index: slice) -> List[List[str]]: ...
+    def __getitem__(self, index: slice) -> np.ndarray: ...
 
-    def __getitem__(self, index: Union[int, slice, Coord]) -> List[str]:
+    def __getitem__(self, index: Union[int, slice, Coord]) -> np.ndarray:
         if isinstance(index, Coord):
             x, y = index
-            return self._labyrinth[y][x]
+            return self._labyrinth[y, x]
 
         return self._labyrinth[index]
 
     def __setitem__(self, key: Union[int, Coord], value):
         if isinstance(key, Coord):
-            self._labyrinth[key.y][key.x] = value
+            self._labyrinth[key.y, key.x] = value
         else:
             self._labyrinth[key] = value
 
@@ -1,17 +1,30 @@
-from collections import deque
-from typing import overload, Union, List, Iterable
+import mmap
+import tempfile
+from array import array
+from heapq import heappush, heappop
+from typing import overload, Union, List, Iterable, Sequence, MutableSequence
 
 import numpy as np
-from tqdm import tqdm
 
-from .utils import Coord
-from .settings import VISITED
+from .utils import Coord, row_blocks
+from .progress import Progress, SOLVE
+from .settings import VISITED, BFS, BIDIRECTIONAL_BFS, ASTAR, DEAD_END_FILLING
+
+FORWARD = 2
+BACKWARD = 3
 
 
 class Matrix:
 
-    def __init__(self, matrix: Iterable[Iterable[int]]):
-        self.matrix = list(map(list, matrix))
+    def __init__(self, matrix: Iterable[Iterable[int]], progress: Progress = None, scratch: str = None):
+        """
+        :param matrix: cells, VISITED ones are walls
+        :param progress: hooks of solving stage
+        :param scratch: directory for temporary files backing the search state of solvers, in memory if None
+        """
+        self.matrix = np.asarray(matrix, dtype=np.uint8)
+        self.progress = progress or Progress()
+        self.scratch = scratch
 
     def is_visited(self, coord: Coord) -> bool:
         return self[coord] == VISITED
@@ -23,45 +36,238 @@ class Matrix:
         self[coord] = VISITED
 
     def get_not_visited(self) -> List[Coord]:
-        coords = []
-        for y, row in enumerate(self):
-            for x, el in enumerate(row):
-                coord = Coord(x, y)
-                if self.is_not_visited(coord):
-                    coords.append(coord)
-        return coords
+        ys, xs = np.nonzero(self.matrix != VISITED)
+        return [Coord(x, y) for y, x in zip(ys.tolist(), xs.tolist())]
 
     def bfs(self, start: Coord, end: Coord) -> Iterable[Coord]:
-
+        """Shortest way from start to the cell before end, the matrix itself is not changed."""
         start = start.normalize(self.shape)
         end = end.normalize(self.shape)
 
-        way_map = Matrix([[0 for _ in row] for row in self])
-        dq = deque([start])
-        self.visit(start)
-        status = tqdm(total=len(self.get_not_visited()), desc='BFS', unit='Cell')
-        while dq:
-            current: Coord = dq.popleft()
-            neighborhood = current.neighborhood()
-            neighborhood = filter(self.is_legal, neighborhood)
-            not_visited_neighborhood = list(filter(self.is_not_visited, neighborhood))
-
-            if not_visited_neighborhood:
-                dq.extend(not_visited_neighborhood)
-                for neighbor in not_visited_neighborhood:
-                    way_map[neighbor] = current
-                    self.visit(neighbor)
+        visited = self.padded()
+        stride = self.shape[1] + 2
+        offsets = (-stride, stride, -1, 1)
+        source = self.to_index(start, stride)
+        target = self.to_index(end, stride)
+
+        parents = self.allocate(len(visited), self.index_type(visited), -1)
+        queue = self.allocate(len(visited), self.index_type(visited))
+        queue[0] = source
+        head, tail = 0, 1
+        visited[source] = VISITED
+        with self.progress.span(SOLVE, self.count_not_visited()) as status:
+            while head != tail:
+                current = queue[head]
+                head += 1
+                for offset in offsets:
+                    neighbor = current + offset
+                    if visited[neighbor]:
+                        continue
+
+                    visited[neighbor] = VISITED
+                    parents[neighbor] = current
                     status.update()
-                    if neighbor == end:
-                        return self.generate_way(current, way_map)
-        return []
+                    if neighbor == target:
+                        return self.generate_way(current, parents, stride)
+
+                    queue[tail] = neighbor
+                    tail += 1
+            return []
+
+    def bidirectional_bfs(self, start: Coord, end: Coord) -> Iterable[Coord]:
+        """BFS growing layers from both ends, the smaller frontier first, until they meet."""
+        start = start.normalize(self.shape)
+        end = end.normalize(self.shape)
+
+        owners = self.padded()
+        stride = self.shape[1] + 2
+        offsets = (-stride, stride, -1, 1)
+        source = self.to_index(start, stride)
+        target = self.to_index(end, stride)
+        if source == target:
+            return []
+
+        parents = self.allocate(len(owners), self.index_type(owners), -1)
+        owners[source] = FORWARD
+        owners[target] = BACKWARD
+        frontiers = {FORWARD: [source], BACKWARD: [target]}
+        with self.progress.span(SOLVE, self.count_not_visited()) as status:
+            while frontiers[FORWARD] and frontiers[BACKWARD]:
+                side = FORWARD if len(frontiers[FORWARD]) <= len(frontiers[BACKWARD]) else BACKWARD
+                other = BACKWARD if side == FORWARD else FORWARD
+                layer = []
+                for current in frontiers[side]:
+                    for offset in offsets:
+                        neighbor = current + offset
+                        owner = owners[neighbor]
+                        if owner == other:
+                            if side == FORWARD:
+                                return self.join_ways(current, neighbor, parents, stride)
+                            return self.join_ways(neighbor, current, parents, stride)
+                        if owner:
+                            continue
+
+                        owners[neighbor] = side
+                        parents[neighbor] = current
+                        layer.append(neighbor)
+                        status.update()
+                frontiers[side] = layer
+            return []
+
+    def astar(self, start: Coord, end: Coord) -> Iterable[Coord]:
+        """A* search with the Manhattan distance to end as heuristic."""
+        start = start.normalize(self.shape)
+        end = end.normalize(self.shape)
+
+        visited = self.padded()
+        stride = self.shape[1] + 2
+        offsets = (-stride, stride, -1, 1)
+        source = self.to_index(start, stride)
+        target = self.to_index(end, stride)
+        target_y, target_x = divmod(target, stride)
+
+        parents = self.allocate(len(visited), self.index_type(visited), -1)
+        distances = self.allocate(len(visited), self.index_type(visited), -1)
+        distances[source] = 0
+        heap = [(0, 0, source)]
+        with self.progress.span(SOLVE, self.count_not_visited()) as status:
+            while heap:
+                _, _, current = heappop(heap)
+                if visited[current]:
+                    continue
+
+                visited[current] = VISITED
+                status.update()
+                distance = distances[current] + 1
+                for offset in offsets:
+                    neighbor = current + offset
+                    if visited[neighbor]:
+                        continue
+
+                    if neighbor == target:
+                        return self.generate_way(current, parents, stride)
+
+                    if distances[neighbor] == -1 or distance < distances[neighbor]:
+                        distances[neighbor] = distance
+                        parents[neighbor] = current
+                        y, x = divmod(neighbor, stride)
+                        heappush(heap, (distance + abs(y - target_y) + abs(x - target_x), -distance, neighbor))
+            return []
+
+    def dead_end_fill(self, start: Coord, end: Coord) -> Iterable[Coord]:
+        """Fill dead ends with whole-array operations until only the way (for a perfect maze) is left.
+
+        The first pass counts open neighbours of every cell with shifted slices,
+        later passes only recount the open neighbours of the cells filled last.
+        """
+        start = start.normalize(self.shape)
+        end = end.normalize(self.shape)
+
+        height, width = self.shape
+        stride = width + 2
+        opened = np.frombuffer(self.allocate((height + 2) * stride, 'B'), dtype=bool).reshape(height + 2, stride)
+        for first, rows in row_blocks(self.matrix):
+            opened[first + 1:first + 1 + len(rows), 1:-1] = rows != VISITED
+        cells = opened.reshape(-1)
+        offsets = np.array([-stride, stride, -1, 1])
+        source, target = self.to_index(start, stride), self.to_index(end, stride)
+
+        dead_ends = []
+        for first, rows in row_blocks(opened[1:-1]):
+            top, bottom = first + 1, first + 1 + len(rows)
+            counts = (
+                opened[top - 1:bottom - 1, 1:-1].astype(np.uint8) + opened[top + 1:bottom + 1, 1:-1]
+                + rows[:, :-2] + rows[:, 2:]
+            )
+            dead = np.flatnonzero(rows[:, 1:-1] & (counts <= 1))
+            dead_ends.append(top * stride + dead // width * stride + dead % width + 1)
+        dead_ends = np.concatenate(dead_ends)
+
+        with self.progress.span(SOLVE, int(np.count_nonzero(cells))) as status:
+            while True:
+                dead_ends = dead_ends[(dead_ends != source) & (dead_ends != target)]
+                if not dead_ends.size:
+                    break
+
+                cells[dead_ends] = False
+                status.update(dead_ends.size)
+                neighbors = (dead_ends[:, np.newaxis] + offsets).reshape(-1)
+                neighbors = np.unique(neighbors[cells[neighbors]])
+                counts = cells[neighbors + offsets[:, np.newaxis]].sum(axis=0)
+                dead_ends = neighbors[counts <= 1]
+
+        np.logical_not(opened, out=opened)
+        way = Matrix(opened.view(np.uint8)[1:-1, 1:-1], scratch=self.scratch)
+        return way.bfs(start, end)
+
+    def solve(self, start: Coord, end: Coord, strategy: str = BFS) -> Iterable[Coord]:
+        solvers = {
+            BFS: self.bfs,
+            BIDIRECTIONAL_BFS: self.bidirectional_bfs,
+            ASTAR: self.astar,
+            DEAD_END_FILLING: self.dead_end_fill,
+        }
+        try:
+            solver = solvers[strategy]
+        except KeyError:
+            raise ValueError(f'Strategy : {strategy} is not supported.')
+        return solver(start, end)
+
+    def padded(self) -> MutableSequence[int]:
+        """Visited flags of the matrix surrounded by a ring of visited cells, row by row."""
+        height, width = self.shape
+        padded = self.allocate((height + 2) * (width + 2), 'B', VISITED)
+        cells = np.frombuffer(padded, dtype=np.uint8).reshape(height + 2, width + 2)
+        for start, rows in row_blocks(self.matrix):
+            cells[start + 1:start + 1 + len(rows), 1:-1] = rows == VISITED
+        return padded
+
+    def allocate(self, size: int, typecode: str, fill: int = 0) -> MutableSequence[int]:
+        """Array of size items, mapped to a temporary file in the scratch directory if it is set."""
+        if self.scratch is None:
+            return array(typecode, [fill]) * size
+
+        length = size * array(typecode).itemsize
+        with tempfile.TemporaryFile(dir=self.scratch) as file:
+            file.truncate(length)
+            mapped = mmap.mmap(file.fileno(), length)
+        if fill:
+            np.frombuffer(mapped, dtype=typecode).fill(fill)
+        return memoryview(mapped).cast(typecode)
+
+    @staticmethod
+    def index_type(cells: Sequence[int]) -> str:
+        return 'i' if len(cells) < 2 ** 31 else 'q'
+
+    def count_not_visited(self) -> int:
+        visited = sum(int(np.count_nonzero(rows == VISITED)) for _, rows in row_blocks(self.matrix))
+        return self.matrix.size - visited
 
     @staticmethod
-    def generate_way(current: Coord, way_map: 'Matrix') -> Iterable[Coord]:
+    def to_index(coord: Coord, stride: int) -> int:
+        return (coord.y + 1) * stride + coord.x + 1
+
+    @staticmethod
+    def to_coord(index: int, stride: int) -> Coord:
+        y, x = divmod(index, stride)
+        return Coord(x - 1, y - 1)
+
+    @classmethod
+    def join_ways(cls, forward: int, backward: int, parents: Sequence[int], stride: int) -> List[Coord]:
+        """Way from start to the cell before end through the meeting edge of both searches."""
+        way = cls.generate_way(forward, parents, stride)
+        current = backward
+        while parents[current] != -1:
+            way.append(cls.to_coord(current, stride))
+            current = parents[current]
+        return way
+
+    @classmethod
+    def generate_way(cls, current: int, parents: Sequence[int], stride: int) -> List[Coord]:
         way = []
-        while isinstance(current, Coord):
-            way.append(current)
-            current = way_map[current]
+        while current != -1:
+            way.append(cls.to_coord(current, stride))
+            current = parents[current]
         way.reverse()
         return way
 
@@ -71,7 +277,7 @@ class Matrix:
 
     @property
     def shape(self) -> tuple:
-        return np.array(self.matrix).shape
+        return self.matrix.shape
 
     def __iter__(self):
         return iter(self.matrix)
@@ -80,20 +286,17 @@ class Matrix:
     def __getitem__(self, index: Coord) -> int: ...
 
     @overload
-    def __getitem__(self, index: slice) -> List[List[int]]: ...
+    def __getitem__(self, index: slice) -> np.ndarray: ...
 
-    def __getitem__(self, index: Union[int, slice, Coord]) -> List[int]:
+    def __getitem__(self, index: Union[int, slice, Coord]) -> np.ndarray:
         if isinstance(index, Coord):
             x, y = index
-            try:
-                return self.matrix[y][x]
-            except IndexError:
-                pass
+            return self.matrix[y, x]
 
         return self.matrix[index]
 
     def __setitem__(self, key: Union[int, Coord], value):
         if isinstance(key, Coord):
-            self.matrix[key.y][key.x] = value
+            self.matrix[key.y, key.x] = value
         else:
             self.matrix[key] = value
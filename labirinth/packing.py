@@ -0,0 +1,63 @@
+"""Compact binary format of labyrinths.
+
+Layout (little-endian):
+    header  magic b'LAB1', flags (1 byte, bit 0: seed is set), height, width and
+            count of enter cells as uint32, seed as uint64
+    enters  count pairs of uint32 (y, x) of ENTER cells
+    walls   height * width wall bits packed by np.packbits, row by row
+"""
+import struct
+from typing import Optional, Tuple, Union
+
+import numpy as np
+
+from .settings import WALL, ENTER
+
+MAGIC = b'LAB1'
+HEADER = struct.Struct('<4sB3xIIIQ')
+HAS_SEED = 1
+
+Buffer = Union[bytes, bytearray, memoryview, np.ndarray]
+
+
+def pack(cells: np.ndarray, seed: int = None) -> bytes:
+    height, width = cells.shape
+    flags = 0
+    if seed is not None:
+        if not 0 <= seed < 2 ** 64:
+            raise ValueError(f'Seed : {seed} does not fit into 64 bits.')
+        flags |= HAS_SEED
+
+    enters = np.argwhere(cells == ENTER).astype('<u4')
+    header = HEADER.pack(MAGIC, flags, height, width, len(enters), seed or 0)
+    walls = np.packbits(cells == WALL, axis=None)
+    return b''.join((header, enters.tobytes(), walls.tobytes()))
+
+
+def unpack_header(buffer: Buffer) -> Tuple[int, int, int, Optional[int]]:
+    """Height, width, count of enters and seed."""
+    if len(buffer) < HEADER.size:
+        raise ValueError('Data is too short for a labyrinth.')
+
+    magic, flags, height, width, count, seed = HEADER.unpack_from(buffer)
+    if magic != MAGIC:
+        raise ValueError('Data is not a packed labyrinth.')
+
+    return height, width, count, seed if flags & HAS_SEED else None
+
+
+def unpack(buffer: Buffer) -> Tuple[np.ndarray, Optional[int]]:
+    """Cells and seed, the wall bits are read in place, buffer can be a np.memmap of a file."""
+    height, width, count, seed = unpack_header(buffer)
+    data = np.frombuffer(buffer, dtype=np.uint8)
+    walls_offset = HEADER.size + 8 * count
+    walls_size = (height * width + 7) // 8
+    if data.size < walls_offset + walls_size:
+        raise ValueError('Packed labyrinth is truncated.')
+
+    enters = np.frombuffer(buffer, dtype='<u4', count=2 * count, offset=HEADER.size).reshape(count, 2)
+    bits = data[walls_offset:walls_offset + walls_size]
+    # unpacked bits are cell codes already: EMPTY is 0 and WALL is 1
+    cells = np.unpackbits(bits, count=height * width).reshape(height, width)
+    cells[enters[:, 0], enters[:, 1]] = ENTER
+    return cells, seed
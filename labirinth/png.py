@@ -0,0 +1,90 @@
+import struct
+import zlib
+from typing import BinaryIO
+
+import numpy as np
+
+SIGNATURE = b'\x89PNG\r\n\x1a\n'
+COLOR_PALETTE = 3
+CHUNK_SIZE = 1 << 16
+
+
+class PNGWriter:
+    """Streaming encoder of palette PNG images.
+
+    Rows of palette indexes are packed to the smallest bit depth fitting the
+    palette, filtered with filter type 0 and compressed as they come, so only
+    the rows of one write call are held in memory.
+    """
+
+    def __init__(self, file: BinaryIO, width: int, height: int, palette: np.ndarray, level: int = 6):
+        if width < 1 or height < 1:
+            raise ValueError(f'Image size : {width}x{height} is not supported.')
+        if not 1 <= len(palette) <= 256:
+            raise ValueError('Palette must have from 1 to 256 colors.')
+
+        self.file = file
+        self.width = width
+        self.height = height
+        self.bit_depth = next(depth for depth in (1, 2, 4, 8) if len(palette) <= 1 << depth)
+        self.compressor = zlib.compressobj(level)
+        self.buffer = bytearray()
+        self.rows = 0
+
+        self.file.write(SIGNATURE)
+        self.write_chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, self.bit_depth, COLOR_PALETTE, 0, 0, 0))
+        self.write_chunk(b'PLTE', np.asarray(palette, dtype=np.uint8).tobytes())
+
+    def write(self, indexes: np.ndarray):
+        """Append (rows, width) palette indexes."""
+        rows, width = indexes.shape
+        if width != self.width:
+            raise ValueError(f'Rows must be {self.width} pixels wide, got {width}.')
+        if self.rows + rows > self.height:
+            raise ValueError(f'Image has only {self.height} rows.')
+
+        packed = self.pack(indexes)
+        scanlines = np.zeros((rows, packed.shape[1] + 1), dtype=np.uint8)
+        scanlines[:, 1:] = packed
+        self.buffer += self.compressor.compress(scanlines.tobytes())
+        self.rows += rows
+        if len(self.buffer) >= CHUNK_SIZE:
+            self.write_chunk(b'IDAT', bytes(self.buffer))
+            self.buffer.clear()
+
+    def pack(self, indexes: np.ndarray) -> np.ndarray:
+        """Several indexes per byte for bit depths under 8, the first one in the high bits."""
+        indexes = indexes.astype(np.uint8, copy=False)
+        if self.bit_depth == 8:
+            return indexes
+
+        per_byte = 8 // self.bit_depth
+        rows, width = indexes.shape
+        packed = np.zeros((rows, -(-width // per_byte)), dtype=np.uint8)
+        for i in range(per_byte):
+            part = indexes[:, i::per_byte]
+            packed[:, :part.shape[1]] |= part << np.uint8(8 - self.bit_depth * (i + 1))
+        return packed
+
+    def close(self):
+        if self.rows != self.height:
+            raise ValueError(f'Image has {self.height} rows, only {self.rows} were written.')
+
+        self.buffer += self.compressor.flush()
+        self.write_chunk(b'IDAT', bytes(self.buffer))
+        self.buffer.clear()
+        self.write_chunk(b'IEND', b'')
+        self.file.flush()
+
+    def write_chunk(self, chunk_type: bytes, data: bytes):
+        self.file.write(struct.pack('>I', len(data)))
+        self.file.write(chunk_type)
+        self.file.write(data)
+        self.file.write(struct.pack('>I', zlib.crc32(data, zlib.crc32(chunk_type))))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.close()
@@ -0,0 +1,105 @@
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional
+
+from tqdm import tqdm
+
+GENERATE = 'generate'
+SOLVE = 'solve'
+RENDER = 'render'
+ENCODE = 'encode'
+RECOGNIZE = 'recognize'
+
+STAGES = (GENERATE, SOLVE, RENDER, ENCODE, RECOGNIZE)
+
+
+class Span:
+    """Timed stage of work, processed items are passed to the progress in coarse batches."""
+
+    def __init__(self, progress: 'Progress', stage: str, total: int = None, interval: int = None):
+        self.progress = progress
+        self.stage = stage
+        self.total = total
+        self.interval = interval or max((total or 0) // 100, 1)
+        self.count = 0
+        self.reported = 0
+        self.started = 0.0
+
+    def update(self, n: int = 1):
+        self.count += n
+        if self.count - self.reported >= self.interval:
+            self.progress.on_update(self.stage, self.count - self.reported)
+            self.reported = self.count
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        self.progress.on_start(self.stage, self.total)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self.count != self.reported:
+            self.progress.on_update(self.stage, self.count - self.reported)
+            self.reported = self.count
+        self.progress.on_finish(self.stage, time.perf_counter() - self.started, self.count)
+
+
+class Progress:
+    """Hooks called for every stage of work, this one ignores them all.
+
+    Subclasses override on_start, on_update and on_finish, stages report
+    through spans: `with progress.span(GENERATE, total) as span: span.update()`.
+    """
+
+    def span(self, stage: str, total: int = None, interval: int = None) -> Span:
+        return Span(self, stage, total, interval)
+
+    def on_start(self, stage: str, total: Optional[int]):
+        pass
+
+    def on_update(self, stage: str, count: int):
+        pass
+
+    def on_finish(self, stage: str, seconds: float, count: int):
+        pass
+
+
+class TqdmProgress(Progress):
+    """Progress bar per stage, nested stages get their own bars."""
+
+    def __init__(self, **options):
+        self.options = options
+        self.bars: List[tqdm] = []
+
+    def on_start(self, stage: str, total: Optional[int]):
+        self.bars.append(tqdm(total=total, desc=stage.capitalize(), **self.options))
+
+    def on_update(self, stage: str, count: int):
+        self.bars[-1].update(count)
+
+    def on_finish(self, stage: str, seconds: float, count: int):
+        self.bars.pop().close()
+
+
+class StatsProgress(Progress):
+    """Totals of time, processed items and calls per stage.
+
+    :param callback: called with stage, seconds and count of every finished span
+    """
+
+    def __init__(self, callback: Callable[[str, float, int], None] = None):
+        self.callback = callback
+        self.seconds: Dict[str, float] = defaultdict(float)
+        self.counts: Dict[str, int] = defaultdict(int)
+        self.calls: Dict[str, int] = defaultdict(int)
+
+    def on_finish(self, stage: str, seconds: float, count: int):
+        self.seconds[stage] += seconds
+        self.counts[stage] += count
+        self.calls[stage] += 1
+        if self.callback is not None:
+            self.callback(stage, seconds, count)
+
+    def reset(self):
+        self.seconds.clear()
+        self.counts.clear()
+        self.calls.clear()
@@ -1,9 +1,61 @@
-WALL = '■'
-EMPTY = '□'
-ENTER = '❌'
+EMPTY = 0
+WALL = 1
+ENTER = 2
 VISITED = 1
 NOT_VISITED = 0
 
+SYMBOLS = {
+    EMPTY: '□',
+    WALL: '■',
+    ENTER: '❌',
+}
+
+COLORS = {
+    EMPTY: (255, 255, 255),
+    WALL: (0, 0, 0),
+    ENTER: (255, 0, 0),
+}
+
+BACKTRACKER = 'backtracker'
+KRUSKAL = 'kruskal'
+PRIM = 'prim'
+WILSON = 'wilson'
+BINARY_TREE = 'binary_tree'
+SIDEWINDER = 'sidewinder'
+
+ALGORITHMS = [
+    BACKTRACKER,
+    KRUSKAL,
+    PRIM,
+    WILSON,
+    BINARY_TREE,
+    SIDEWINDER,
+]
+
+BFS = 'bfs'
+BIDIRECTIONAL_BFS = 'bidirectional'
+ASTAR = 'astar'
+DEAD_END_FILLING = 'dead_end'
+
+STRATEGIES = [
+    BFS,
+    BIDIRECTIONAL_BFS,
+    ASTAR,
+    DEAD_END_FILLING,
+]
+
+JPEG = 'JPEG'
+PNG = 'PNG'
+WEBP = 'WEBP'
+
+IMAGE_SUFFIXES = {
+    JPEG: '.jpg',
+    PNG: '.png',
+    WEBP: '.webp',
+}
+
+MIN_FRAME_DELAY = 20
+
 
 LOW_EXTENSION = 16
 MEDIUM_EXTENSION = 32
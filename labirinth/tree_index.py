@@ -0,0 +1,152 @@
+from typing import List, Iterable, Sequence
+
+import numpy as np
+
+from .matrix import Matrix
+from .utils import Coord, BLOCK_CELLS
+from .progress import SOLVE
+
+
+class TreeIndex:
+    """Open cells of a perfect labyrinth as a tree rooted at one cell, built once and queried many times.
+
+    Nodes are numbered in BFS order, so the parent of a node always has a smaller number.
+    Binary lifting tables give the lowest common ancestor of two nodes in O(log n), which makes
+    distances O(log n) and ways O(log n + length of the way). Tables are allocated by the matrix,
+    so they are mapped to temporary files when it has a scratch directory.
+    """
+
+    def __init__(self, matrix: Matrix, root: Coord = None):
+        height, width = matrix.shape
+        self.shape = matrix.shape
+        self.stride = width + 2
+        visited = matrix.padded()
+        if root is None:
+            source = self.first_free(visited)
+        else:
+            root = root.normalize(self.shape)
+            if not matrix.is_legal(root) or matrix.is_visited(root):
+                raise ValueError(f'{root} is not a free cell.')
+            source = Matrix.to_index(root, self.stride)
+
+        total = matrix.count_not_visited()
+        typecode = Matrix.index_type(visited)
+        offsets = (-self.stride, self.stride, -1, 1)
+        cells = matrix.allocate(total, typecode)
+        parents = matrix.allocate(total, typecode)
+        depths = matrix.allocate(total, typecode)
+        cells[0] = source
+        visited[source] = 1
+        tail = 1
+        with matrix.progress.span(SOLVE, total) as status:
+            head = 0
+            while head < tail:
+                current = cells[head]
+                depth = depths[head] + 1
+                for offset in offsets:
+                    neighbor = current + offset
+                    if visited[neighbor]:
+                        continue
+
+                    visited[neighbor] = 1
+                    cells[tail] = neighbor
+                    parents[tail] = head
+                    depths[tail] = depth
+                    tail += 1
+                head += 1
+                status.update()
+        del visited
+
+        self.size = tail
+        self.cells = cells
+        self.parents = parents
+        self.depths = depths
+        self.nodes = matrix.allocate((height + 2) * self.stride, typecode, -1)
+        nodes = np.frombuffer(self.nodes, dtype=typecode)
+        for start in range(0, tail, BLOCK_CELLS):
+            end = min(start + BLOCK_CELLS, tail)
+            nodes[np.frombuffer(cells, dtype=typecode)[start:end]] = np.arange(start, end, dtype=typecode)
+
+        # nodes are in BFS order, the last one is the deepest
+        self.lifting = [parents]
+        while 1 << len(self.lifting) <= depths[tail - 1]:
+            previous = np.frombuffer(self.lifting[-1], dtype=typecode)
+            level = matrix.allocate(total, typecode)
+            current = np.frombuffer(level, dtype=typecode)
+            for start in range(0, tail, BLOCK_CELLS):
+                end = min(start + BLOCK_CELLS, tail)
+                current[start:end] = previous[previous[start:end]]
+            self.lifting.append(level)
+
+    @staticmethod
+    def first_free(visited: Sequence[int]) -> int:
+        flags = np.frombuffer(visited, dtype=np.uint8)
+        for start in range(0, len(flags), BLOCK_CELLS):
+            free = np.flatnonzero(flags[start:start + BLOCK_CELLS] == 0)
+            if free.size:
+                return start + int(free[0])
+        raise ValueError('Matrix has no free cells.')
+
+    def node(self, coord: Coord) -> int:
+        coord = coord.normalize(self.shape)
+        height, width = self.shape
+        node = -1
+        if 0 <= coord.x < width and 0 <= coord.y < height:
+            node = int(self.nodes[Matrix.to_index(coord, self.stride)])
+        if node == -1:
+            raise ValueError(f'{coord} is not reachable from the root.')
+        return node
+
+    def ancestor(self, node: int, steps: int) -> int:
+        level = 0
+        while steps:
+            if steps & 1:
+                node = self.lifting[level][node]
+            steps >>= 1
+            level += 1
+        return node
+
+    def lca(self, first: int, second: int) -> int:
+        """Lowest common ancestor of two nodes."""
+        if self.depths[first] < self.depths[second]:
+            first, second = second, first
+        first = self.ancestor(first, self.depths[first] - self.depths[second])
+        if first == second:
+            return first
+
+        for level in reversed(self.lifting):
+            if level[first] != level[second]:
+                first, second = level[first], level[second]
+        return self.parents[first]
+
+    def distance(self, start: Coord, end: Coord) -> int:
+        """Count of steps of the way between two cells."""
+        first, second = self.node(start), self.node(end)
+        return self.depths[first] + self.depths[second] - 2 * self.depths[self.lca(first, second)]
+
+    def way(self, start: Coord, end: Coord) -> List[Coord]:
+        """Cells of the way from start to end, both included."""
+        first, second = self.node(start), self.node(end)
+        common = self.lca(first, second)
+        way = self.climb(first, common)
+        back = self.climb(second, common)
+        way.append(Matrix.to_coord(self.cells[common], self.stride))
+        way.extend(reversed(back))
+        return way
+
+    def ways(self, start: Coord, ends: Iterable[Coord]) -> List[List[Coord]]:
+        return [self.way(start, end) for end in ends]
+
+    def distances(self, start: Coord, ends: Iterable[Coord]) -> List[int]:
+        return [self.distance(start, end) for end in ends]
+
+    def climb(self, node: int, ancestor: int) -> List[Coord]:
+        """Cells from node up to ancestor, ancestor excluded."""
+        way = []
+        while node != ancestor:
+            way.append(Matrix.to_coord(self.cells[node], self.stride))
+            node = self.parents[node]
+        return way
+
+    def __len__(self):
+        return self.size
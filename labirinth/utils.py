@@ -1,4 +1,9 @@
-from typing import NamedTuple, Tuple
+import random
+from typing import NamedTuple, Tuple, Optional, Iterator
+
+import numpy as np
+
+BLOCK_CELLS = 1 << 24
 
 
 def is_even(x: int) -> bool:
@@ -9,6 +14,20 @@ def is_odd(x: int) -> bool:
     return not is_even(x)
 
 
+def get_rng(seed: Optional[int] = None, rng: Optional[random.Random] = None) -> random.Random:
+    """Given rng or a new generator for seed (randomly seeded if seed is None)."""
+    if rng is not None:
+        return rng
+    return random.Random(seed)
+
+
+def row_blocks(array: np.ndarray, cells: int = BLOCK_CELLS) -> Iterator[Tuple[int, np.ndarray]]:
+    """First row index and view of consecutive blocks of about cells items, passes over mapped grids stay bounded."""
+    step = max(cells // max(array.shape[1], 1), 1)
+    for start in range(0, len(array), step):
+        yield start, array[start:start + step]
+
+
 class Coord(NamedTuple):
     x: int
     y: int